@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+# đo thời gian mở TPLabel (import + tạo MainWindow + show), chạy process mới mỗi lần
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from gui.main_window import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("torch", "ultralytics") if m in sys.modules]
+print(f"{elapsed:.3f} {','.join(heavy) or '-'}")
+"""
+
+
+def main(runs=5):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", SNIPPET],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        seconds, heavy = out.split()
+        times.append(float(seconds))
+        print(f"startup {float(seconds):.3f}s  heavy modules loaded: {heavy}")
+    times.sort()
+    print(f"median {times[len(times) // 2]:.3f}s  best {times[0]:.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
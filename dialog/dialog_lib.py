@@ -1,5 +1,8 @@
 # chọn folder, confirm
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
+import os
+from PyQt5.QtWidgets import (
+    QFileDialog, QMessageBox, QCheckBox, QDialog, QDialogButtonBox, QLabel, QVBoxLayout
+)
 
 
 class DialogLib:
@@ -26,7 +29,7 @@ class DialogLib:
         )
 
     @staticmethod
-    def confirm(parent, image_count, model_path, label_dir):
+    def confirm(parent, image_count, model_path, label_dir, tile_size):
         msg = (
             f"Bạn có chắc muốn auto label?\n\n"
             f"📂 Ảnh: {image_count}\n"
@@ -34,9 +37,54 @@ class DialogLib:
             f"📁 Output: {label_dir}"
         )
 
+        dialog = QDialog(parent)
+        dialog.setWindowTitle("Confirm Auto Label")
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(msg))
+        # mặc định label lại toàn bộ cả frame như trước, incremental / tile là tùy chọn
+        incremental = QCheckBox("Chỉ label ảnh mới / đã thay đổi (bỏ qua ảnh đã label bằng model này)")
+        tiled = QCheckBox(f"Chạy theo tile {tile_size}px (ảnh lớn, vật thể nhỏ)")
+        layout.addWidget(incremental)
+        layout.addWidget(tiled)
+        buttons = QDialogButtonBox(QDialogButtonBox.Yes | QDialogButtonBox.No)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        # trả về (ok, incremental, tiled)
+        return dialog.exec_() == QDialog.Accepted, incremental.isChecked(), tiled.isChecked()
+
+    @staticmethod
+    def confirm_resume(parent, job):
+        msg = (
+            f"Tiếp tục auto label chưa hoàn tất?\n\n"
+            f"📂 Ảnh: {job['image_dir']}\n"
+            f"🤖 Model: {job['model_path']}\n"
+            f"🎯 Conf: {job['conf']}\n"
+            f"📁 Output: {job['label_dir']}"
+        )
+        if job.get("tile_size"):
+            msg += f"\n🧩 Tile: {job['tile_size']}px"
+
+        return QMessageBox.question(
+            parent,
+            "Resume Auto Label",
+            msg,
+            QMessageBox.Yes | QMessageBox.No
+        ) == QMessageBox.Yes
+
+    @staticmethod
+    def confirm_recovery(parent, label_paths):
+        names = "\n".join(os.path.basename(p) for p in label_paths[:10])
+        more = f"\n... (+{len(label_paths) - 10})" if len(label_paths) > 10 else ""
+        msg = (
+            f"Phát hiện thay đổi chưa lưu từ lần chạy trước.\n"
+            f"Khôi phục {len(label_paths)} file label?\n\n"
+            f"{names}{more}"
+        )
+
         return QMessageBox.question(
             parent,
-            "Confirm Auto Label",
+            "Recover Labels",
             msg,
             QMessageBox.Yes | QMessageBox.No
         ) == QMessageBox.Yes
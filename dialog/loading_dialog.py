@@ -1,14 +1,77 @@
-from PyQt5.QtWidgets import QDialog, QLabel, QVBoxLayout
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QDialog, QLabel, QVBoxLayout, QProgressBar, QPushButton
+from PyQt5.QtCore import Qt, pyqtSignal
 
 class LoadingDialog(QDialog):
+    cancel_requested = pyqtSignal()
+
     def __init__(self, parent = None):
         super().__init__(parent)
         self.setWindowTitle("Processing")
         self.setModal(True)
-        self.setFixedSize(250, 100)
+        self.setFixedSize(360, 190)
         layout = QVBoxLayout()
         self.label = QLabel("Auto labeling running...")
         self.label.setAlignment(Qt.AlignCenter)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.rate_label = QLabel("")
+        self.rate_label.setAlignment(Qt.AlignCenter)
+        self.stage_label = QLabel("")
+        self.stage_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.label)
-        self.setLayout(layout)
\ No newline at end of file
+        layout.addWidget(self.progress)
+        layout.addWidget(self.rate_label)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.request_cancel)
+        layout.addWidget(self.stage_label)
+        layout.addWidget(self.btn_cancel)
+        self.setLayout(layout)
+        self.cancelling = False
+
+    def request_cancel(self):
+        if not self.btn_cancel.isEnabled():
+            return
+        self.cancelling = True
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.setText("Cancelling...")
+        self.label.setText("Stopping after current batch...")
+        self.cancel_requested.emit()
+
+    # Esc / nút X: cancel job thay vì chỉ đóng dialog
+    def reject(self):
+        self.request_cancel()
+
+    # worker đã dừng -> đóng thật (close() sẽ gọi reject)
+    def finish(self):
+        self.accept()
+
+    @staticmethod
+    def format_eta(seconds):
+        if seconds is None:
+            return "--:--"
+        seconds = int(seconds)
+        h, rest = divmod(seconds, 3600)
+        m, s = divmod(rest, 60)
+        if h:
+            return f"{h}:{m:02d}:{s:02d}"
+        return f"{m:02d}:{s:02d}"
+
+    def update_progress(self, info):
+        done = info["done"]
+        total = info["total"]
+        self.progress.setRange(0, max(1, total))
+        self.progress.setValue(done)
+        # đã bấm cancel: giữ thông báo đang dừng, chỉ cập nhật số ảnh
+        if self.cancelling:
+            self.label.setText(f"Stopping after current batch... ({done} / {total})")
+        else:
+            self.label.setText(f"Auto labeling {done} / {total}")
+        self.rate_label.setText(
+            f"{info['rate']:.1f} img/s | ETA {self.format_eta(info['eta'])}"
+        )
+        latency = info["latency_ms"]
+        self.stage_label.setText(
+            f"decode {latency['decode']:.0f} ms | "
+            f"infer {latency['infer']:.0f} ms | "
+            f"write {latency['write']:.0f} ms"
+        )
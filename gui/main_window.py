@@ -1,28 +1,40 @@
+import hashlib
 import os
-import cv2
-import numpy as np
+import threading
 from PyQt5.QtWidgets import (
     QWidget, QPushButton, QLabel, QMainWindow, QMessageBox, 
     QVBoxLayout, QHBoxLayout, QFileDialog, QAction, QListWidget,
-    QListWidgetItem, QShortcut, QSizePolicy
+    QListWidgetItem, QShortcut, QSizePolicy, QListView
 )
-from PyQt5.QtCore import Qt, QRect, QRectF
+from PyQt5.QtCore import Qt, QRect, QRectF, QTimer
 from PyQt5.QtGui import QPixmap, QImage, QKeySequence
 
 from libs.file_lib import FileLib
 from libs.edit_lib import EditLib
 from widgets.image_canvas import ImageCanvas
+from widgets.image_list_model import ImageListModel
+from widgets.edit_history import HistoryStore
 from libs.view_lib import ViewLib
 from libs.help_lib import HelpLib
+from libs.image_prefetcher import ImagePrefetcher
+from libs.image_scan import scan_images
+from libs.folder_watcher import FolderWatcher
+from libs.label_saver import LabelSaver
+from libs.annotation_journal import AnnotationJournal
 from dialog.dialog_lib import DialogLib
 from dialog.select_label_dialog import SelectLabelDialog
-from logic.auto_label_logic import AutoLabelLogic
+from logic.auto_label_logic import AutoLabelLogic, prewarm, TILE_SIZE, TILE_OVERLAP
 from dialog.new_label_dialog import NewLabelDialog
 from gui.logger import setup_logger
 from logic.auto_label_worker import AutoLabelWorker
 from dialog.loading_dialog import LoadingDialog
 log = setup_logger()
 
+
+def label_sig(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -34,6 +46,15 @@ class MainWindow(QMainWindow):
         self.help_lib = HelpLib(self)
         self.canvas = ImageCanvas()
         self.logic = AutoLabelLogic()
+        self.prefetcher = ImagePrefetcher()
+        self.history_store = HistoryStore()
+        self.label_saver = LabelSaver(self)
+        self.label_saver.pending_changed.connect(self.on_pending_writes)
+        self.journal = AnnotationJournal()
+        self.label_saver.saved_signal.connect(self.journal.written)
+        self.label_saver.error_signal.connect(self.on_save_error)
+        self.folder_watcher = FolderWatcher(self)
+        self.folder_watcher.images_added.connect(self.on_images_added)
 
         self.labels = []
         self.label_to_id = {}
@@ -42,11 +63,41 @@ class MainWindow(QMainWindow):
         self.current_mode = None 
 
         self.labels_dir = None
+        # hash nội dung label file của ảnh đang mở (lúc load / lúc lưu)
+        self.label_sig = None
+        # danh sách class đã ghi vào classes.txt, chỉ ghi lại khi thay đổi
+        self.saved_classes = None
         self.dirty = False
         QShortcut(QKeySequence("Ctrl+S"), self, self.save_label)
 
         # self.init_menu()
         self.init_ui()
+        # import torch/ultralytics nền sau khi window đã hiện
+        QTimer.singleShot(500, self.prewarm_auto_label)
+        QTimer.singleShot(0, self.recover_journal)
+
+    def recover_journal(self):
+        # lần trước bị crash/tắt khi còn thay đổi chưa lưu -> replay journal
+        # (chỉ journal của process đã thoát, instance khác đang chạy thì bỏ qua)
+        pending = self.journal.recover()
+        try:
+            self.journal.start()
+        except OSError as e:
+            log.warning(f"Journal disabled: {e}")
+        if pending and DialogLib.confirm_recovery(self, sorted(pending)):
+            for label_path, text in pending.items():
+                # ghi vào journal mới trước, ghi lỗi thì lần sau vẫn khôi phục được
+                self.journal.saved(label_path, text)
+                self.label_saver.save(label_path, text)
+            log.info(f"Recovered label files: {len(pending)}")
+            if self.journal.file is None:
+                # không có journal mới giữ bản khôi phục -> ghi xong mới xóa journal cũ
+                self.label_saver.flush()
+        self.journal.finish_recovery()
+        self.journal.compact()
+
+    def prewarm_auto_label(self):
+        threading.Thread(target=prewarm, daemon=True).start()
 
     # UI
     def init_ui(self):
@@ -79,6 +130,7 @@ class MainWindow(QMainWindow):
         status_layout = QHBoxLayout()
         status_layout.addWidget(self.model_label)
         status_layout.addStretch()
+        status_layout.addWidget(self.pending_info)
         status_layout.addWidget(self.image_info)
 
         # canvas
@@ -137,9 +189,12 @@ class MainWindow(QMainWindow):
         # label list 
         self.label_list = QListWidget()
         self.label_list.itemClicked.connect(self.on_label_selected)
-        # image list 
-        self.image_list = QListWidget()
-        self.image_list.itemClicked.connect(self.on_image_selected)
+        # image list (model/view: chỉ vẽ row đang hiện)
+        self.image_model = ImageListModel(self)
+        self.image_list = QListView()
+        self.image_list.setUniformItemSizes(True)
+        self.image_list.setModel(self.image_model)
+        self.image_list.clicked.connect(self.on_image_selected)
         self.label_list.setMinimumWidth(180)
         self.image_list.setMinimumWidth(180)
 
@@ -263,14 +318,12 @@ class MainWindow(QMainWindow):
         log.info(f"Select labels folder: {self.labels_dir}")
 
     def load_ok_folder(self, folder):
+        # folder rỗng (camera chưa ghi ảnh) vẫn mở và theo dõi, ảnh mới tự hiện
         images = self.file_lib.load_images(folder)
-        if not images:
-            return
-        
+        self.prefetcher.clear()
         self.current_images = images
-        self.image_list.clear()
-        for img in images:
-            self.image_list.addItem(os.path.basename(img))
+        self.image_model.set_paths(self.current_images)
+        self.folder_watcher.watch(folder, self.current_images)
         self.current_index = 0
         self.current_mode = "OK"
         self.model_label.setText("MODE: OK")
@@ -286,11 +339,12 @@ class MainWindow(QMainWindow):
         self.update_image()
 
     def load_ng_folder(self, folder):
+        # folder rỗng (camera chưa ghi ảnh) vẫn mở và theo dõi, ảnh mới tự hiện
         images = self.file_lib.load_images(folder)
-        if not images:
-            return
-        
+        self.prefetcher.clear()
         self.current_images = images
+        self.image_model.set_paths(self.current_images)
+        self.folder_watcher.watch(folder, self.current_images)
         self.current_index = 0
         self.current_mode = "NG"
         self.model_label.setText("MODE: NG")
@@ -305,17 +359,48 @@ class MainWindow(QMainWindow):
         """)
         self.update_image()
 
+    # ảnh mới từ camera: thêm vào cuối list, giữ nguyên ảnh đang xem
+    def on_images_added(self, paths):
+        was_empty = not self.current_images
+        self.image_model.append_paths(paths)
+        if was_empty:
+            # folder đang rỗng: hiện ảnh đầu tiên vừa tới
+            self.current_index = 0
+            self.update_image()
+        elif self.current_index >= 0:
+            self.image_info.setText(f"{self.current_index + 1} / {len(self.current_images)}")
+        log.info(f"New images detected: {len(paths)}")
+
     def update_image(self):
         if not self.current_images:
+            self.canvas.clear_image()
+            self.dirty = False
+            self.update_window_title()
+            self.image_info.setText("No image")
             return
+        # ghi lại nội dung label của ảnh đang rời đi
+        if self.canvas.has_image():
+            self.canvas.history.label_sig = self.label_sig
         image_path = self.current_images[self.current_index]
-        self.canvas.load_image(image_path)
+        history = self.history_store.get(image_path)
+        self.canvas.load_image(image_path, self.prefetcher.get(image_path), history)
+        self.prefetcher.prefetch_around(self.current_images, self.current_index)
         self.load_label_file(image_path)
+        # label file bị đổi từ bên ngoài -> history cũ không còn đúng
+        if history.label_sig is not None and history.label_sig != self.label_sig:
+            history.clear()
+        # ghi nhật ký các thay đổi box của ảnh này
+        history.listener = self.journal.record
+        if self.labels_dir and self.canvas.has_image():
+            size = self.canvas.image_size
+            self.journal.open(self.label_path(image_path), size.width(), size.height())
+        else:
+            self.journal.open(None, 0, 0)
         self.dirty = False
         self.update_window_title()
         self.image_info.setText(f"{self.current_index + 1} / {len(self.current_images)}")
         self.image_list.blockSignals(True)
-        self.image_list.setCurrentRow(self.current_index)
+        self.image_list.setCurrentIndex(self.image_model.index(self.current_index))
         self.image_list.blockSignals(False)
         log.info(f"Load image: {image_path}")
 
@@ -350,6 +435,39 @@ class MainWindow(QMainWindow):
         self.image_info = QLabel("0 / 0")
         self.image_info.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
 
+        self.pending_info = QLabel("")
+        self.pending_info.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.pending_info.setStyleSheet("color: #E65100;")
+
+    def on_pending_writes(self, count):
+        self.pending_info.setText(f"💾 Saving {count}..." if count else "")
+        if not count:
+            self.journal.compact()
+
+    def on_save_error(self, path, message):
+        # file chưa xuống đĩa -> đánh dấu lại chưa lưu trước khi hiện dialog
+        # (dialog chạy event loop, pending_changed(0) có thể tới trong lúc đó)
+        self.journal.write_failed(path)
+        if self.labels_dir and path == os.path.join(self.labels_dir, "classes.txt"):
+            self.saved_classes = None
+        elif (self.labels_dir and self.canvas.has_image()
+                and 0 <= self.current_index < len(self.current_images)
+                and path == self.label_path(self.current_images[self.current_index])):
+            self.dirty = True
+            self.update_window_title()
+        QMessageBox.critical(
+            self,
+            "Save Error",
+            f"Failed to save label file:\n{path}\n\n{message}"
+        )
+
+    def closeEvent(self, event):
+        # ghi hết label đang chờ trước khi thoát
+        if not self.label_saver.flush(timeout=10):
+            log.warning("Pending label writes not flushed on close")
+        self.journal.close()
+        super().closeEvent(event)
+
     def next_image(self):
         
         if not self.current_images:
@@ -399,16 +517,16 @@ class MainWindow(QMainWindow):
         self.canvas.update()
         print("Selected from list: ", bbox_index)
 
-    def on_image_selected(self, item):
+    def on_image_selected(self, index):
         if not self.check_unsaved():
             return
-        name = item.text()
-        for i, path in enumerate(self.current_images):
-            if os.path.basename(path) == name:
-                self.current_index = i
-                self.update_image()
-                self.load_label_file(path)
-                break
+        # row của model == vị trí trong current_images (dùng chung list)
+        row = index.row()
+        if not 0 <= row < len(self.current_images):
+            return
+        self.current_index = row
+        # update_image đã load label file
+        self.update_image()
 
     def refresh_label_list(self):
         self.label_list.blockSignals(True)
@@ -456,7 +574,7 @@ class MainWindow(QMainWindow):
             label_id = self.labels.index(label_name)
         else:
             return
-        self.canvas.boxes.append({
+        self.canvas.add_box({
             "label": label_id,
             "label_name": label_name,
             "rect" : rect,
@@ -499,6 +617,14 @@ class MainWindow(QMainWindow):
             self.dirty = False
             return True
         elif reply == QMessageBox.No:
+            # bỏ thay đổi -> history của ảnh này không khớp file nữa
+            if self.current_images and 0 <= self.current_index < len(self.current_images):
+                image_path = self.current_images[self.current_index]
+                self.history_store.discard(image_path)
+                if self.labels_dir:
+                    self.journal.discard(self.label_path(image_path))
+                    if not self.label_saver.pending_count():
+                        self.journal.compact()
             self.dirty = False
             self.update_window_title()
             return True
@@ -513,25 +639,30 @@ class MainWindow(QMainWindow):
                 "Please select Labels Folder first"
             )
             return
-        if not self.canvas.pixmap:
+        if not self.canvas.has_image():
             return
 
-        h = self.canvas.pixmap.height()
-        w = self.canvas.pixmap.width()
+        h = self.canvas.image_size.height()
+        w = self.canvas.image_size.width()
         image_path = self.current_images[self.current_index]
         image_name = os.path.splitext(os.path.basename(image_path))[0]
         label_path = os.path.join(self.labels_dir, image_name + ".txt")
 
-        with open(label_path, "w") as f:
-            for item in self.canvas.boxes:
-                label = int(item["label"])
-                box = item["rect"]
-
-                x = (box.center().x()) / w
-                y = (box.center().y()) / h
-                bw = box.width() / w
-                bh = box.height() / h
-                f.write(f"{label} {x:.6f} {y:.6f} {bw:.6f} {bh:.6f}\n")
+        lines = []
+        for item in self.canvas.boxes:
+            label = int(item["label"])
+            box = item["rect"]
+
+            x = (box.center().x()) / w
+            y = (box.center().y()) / h
+            bw = box.width() / w
+            bh = box.height() / h
+            lines.append(f"{label} {x:.6f} {y:.6f} {bw:.6f} {bh:.6f}\n")
+        # ghi nền + atomic, không block GUI
+        text = "".join(lines)
+        self.label_sig = label_sig(text)
+        self.journal.saved(label_path, text)
+        self.label_saver.save(label_path, text)
         self.save_classes_file()
         self.dirty = False
         self.update_window_title()
@@ -552,6 +683,8 @@ class MainWindow(QMainWindow):
         if reply != QMessageBox.Yes:
             return
         
+        # label đang chờ ghi nền không được tạo lại file sau khi xóa
+        self.label_saver.flush()
         try:
             # delete image file
             if os.path.exists(image_path):
@@ -565,13 +698,14 @@ class MainWindow(QMainWindow):
                     log.info(f"Deleted label: {label_path}")
                 else:
                     log.warning(f"Label not found: {label_path}")
-            del self.current_images[self.current_index]
+                self.journal.discard(label_path)
+            self.prefetcher.discard(image_path)
+            self.history_store.discard(image_path)
+            # current_images dùng chung với model -> xóa 1 row, không rebuild
+            self.image_model.remove_row(self.current_index)
             # case: no images left
             if not self.current_images:
-                self.canvas.pixmap = None
-                self.canvas.boxes.clear()
-                self.canvas.update()
-                self.image_list.clear()
+                self.canvas.clear_image()
                 self.current_index = -1
                 self.dirty = False
                 self.update_window_title()
@@ -579,13 +713,6 @@ class MainWindow(QMainWindow):
                 return
             if self.current_index >= len(self.current_images):
                 self.current_index = len(self.current_images) - 1
-            # refresh UI list
-            self.image_list.blockSignals(True)
-            self.image_list.clear()
-            for img in self.current_images:
-                self.image_list.addItem(os.path.basename(img))
-            self.image_list.setCurrentRow(self.current_index)
-            self.image_list.blockSignals(False)
             #load next image
             self.update_image()
             #reset dirty
@@ -604,19 +731,22 @@ class MainWindow(QMainWindow):
     def save_classes_file(self):
         if not self.labels_dir:
             return
+        if self.saved_classes == self.labels:
+            return
         path = os.path.join(self.labels_dir, "classes.txt")
-        with open(path, "w", encoding="utf-8") as f:
-            for name in self.labels:
-                f.write(name + "\n")
+        self.label_saver.save(path, "".join(name + "\n" for name in self.labels))
+        self.saved_classes = list(self.labels)
         log.info(f"Saved classes file: {path}")
 
     def load_classes_file(self):
+        self.saved_classes = None
         classes_path = os.path.join(self.labels_dir, "classes.txt")
         if not os.path.exists(classes_path):
             log.info("classes.txt not found, start with empty labels")
             return
         with open(classes_path, "r", encoding="utf-8") as f:
             self.labels = [line.strip() for line in f if line.strip()]
+        self.saved_classes = list(self.labels)
         log.info(f"Load classes file: {classes_path}")
         log.info(f"Classes: {self.labels}")
         self.refresh_label_list()
@@ -643,8 +773,7 @@ class MainWindow(QMainWindow):
         if action == "select":
             label_id = result
             label_name = self.labels[label_id]
-            item["label"] = label_id
-            item["label_name"] = label_name
+            self.canvas.set_box_label(box_index, label_id, label_name)
         elif action == "new": 
             name = result
             if name in self.labels:
@@ -653,8 +782,7 @@ class MainWindow(QMainWindow):
             self.labels.append(name)
             self.refresh_label_list()
             label_id = len(self.labels) - 1
-            item["label"] = label_id
-            item["label_name"] = name
+            self.canvas.set_box_label(box_index, label_id, name)
             self.canvas.update()
         elif action == "edit":
             idx, new_name = result
@@ -673,71 +801,80 @@ class MainWindow(QMainWindow):
                     b["label_name"] = new_name
         elif action == "delete":
             del_index = result
-            # xóa bbox thuộc label đó
-            self.canvas.boxes = [
-                b for b in self.canvas.boxes
+            # xóa bbox thuộc label đó, update label id phía sau
+            self.canvas.replace_boxes([
+                dict(b, label = b["label"] - 1 if b["label"] > del_index else b["label"])
+                for b in self.canvas.boxes
                 if b["label"] != del_index
-            ]
-
-            # update label id phía sau
-            for b in self.canvas.boxes:
-                if b["label"] > del_index:
-                    b["label"] -= 1
+            ])
             self.labels.pop(del_index)
+            # id class đã đổi -> history của mọi ảnh không còn đúng
+            self.history_store.clear()
             self.refresh_label_list()
-            self.canvas.selected_box = None
         self.canvas.update()
         log.info(f"Edit label on box index={box_index}")
         log.info(f"Action={action}, Result={result}")
 
 
+    def label_path(self, image_path):
+        image_name = os.path.splitext(os.path.basename(image_path))[0]
+        return os.path.join(self.labels_dir, image_name + ".txt")
+
     # load label
     def load_label_file(self, image_path):
         self.canvas.boxes.clear()
+        self.canvas.invalidate_box_index()
+        self.label_sig = None
 
-        if not self.labels_dir or not self.canvas.pixmap:
+        if not self.labels_dir or not self.canvas.has_image():
             return
         image_name = os.path.splitext(os.path.basename(image_path))[0]
         label_path = os.path.join(self.labels_dir, image_name + ".txt")
 
-        if not os.path.exists(label_path):
-            self.canvas.update()
-            return
-        h = self.canvas.pixmap.height()
-        w = self.canvas.pixmap.width()
-
-        with open(label_path, "r") as f:
-            for line in f: 
-                parts = line.strip().split()
-                if len(parts) != 5:
-                    continue
-                label_id = int(parts[0])
-                x, y, bw, bh = map(float, parts[1:])
-
-                cx = x * w
-                cy = y * h
-                rw = bw * w
-                rh = bh * h
-
-                rect = QRect(
-                    int(cx - rw / 2),
-                    int(cy - rh / 2),
-                    int(rw),
-                    int(rh)
-                )
-
-                label_name = (
-                    self.labels[label_id]
-                    if label_id < len(self.labels)
-                    else str(label_id)
-                )
-
-                self.canvas.boxes.append({
-                    "label": label_id,
-                    "label_name": label_name,
-                    "rect": rect,
-                    "selected": False
-                })
+        # file đang chờ ghi nền -> đọc bản trong hàng đợi
+        text = self.label_saver.pending_text(label_path)
+        if text is None:
+            if not os.path.exists(label_path):
+                self.label_sig = label_sig("")
+                self.canvas.update()
+                return
+            with open(label_path, "r") as f:
+                text = f.read()
+        self.label_sig = label_sig(text)
+        h = self.canvas.image_size.height()
+        w = self.canvas.image_size.width()
+
+        for line in text.splitlines():
+            parts = line.strip().split()
+            if len(parts) != 5:
+                continue
+            label_id = int(parts[0])
+            x, y, bw, bh = map(float, parts[1:])
+
+            cx = x * w
+            cy = y * h
+            rw = bw * w
+            rh = bh * h
+
+            rect = QRect(
+                int(cx - rw / 2),
+                int(cy - rh / 2),
+                int(rw),
+                int(rh)
+            )
+
+            label_name = (
+                self.labels[label_id]
+                if label_id < len(self.labels)
+                else str(label_id)
+            )
+
+            self.canvas.boxes.append({
+                "label": label_id,
+                "label_name": label_name,
+                "rect": rect,
+                "selected": False
+            })
         self.refresh_label_list_from_boxes()
         self.canvas.update()
 
@@ -751,19 +888,55 @@ class MainWindow(QMainWindow):
         label_dir = DialogLib.select_label_folder(self)
         if not label_dir:
             return
-        image_count = len([
-            f for f in os.listdir(image_dir)
-            if f.lower().endswith((".jpg", ".png", ".jpeg"))
-        ])
-        ok = DialogLib.confirm(
+        image_count = len(scan_images(image_dir))
+        ok, incremental, tiled = DialogLib.confirm(
             self,
             image_count,
             model_path,
-            label_dir
+            label_dir,
+            TILE_SIZE
         )
         if not ok:
             return
 
+        self.start_auto_label(
+            image_dir,
+            model_path,
+            label_dir,
+            tile_size = TILE_SIZE if tiled else None,
+            incremental = incremental
+        )
+
+    def resume_auto_label(self):
+        label_dir = DialogLib.select_label_folder(self)
+        if not label_dir:
+            return
+        job = self.logic.pending_job(label_dir)
+        if job is None:
+            QMessageBox.information(
+                self,
+                "Resume Auto Label",
+                "Không có job auto label đang dở trong folder này"
+            )
+            return
+        if not DialogLib.confirm_resume(self, job):
+            return
+        log.info(f"Resume auto label: {label_dir}")
+        self.start_auto_label(
+            job["image_dir"],
+            job["model_path"],
+            label_dir,
+            conf = job["conf"],
+            batch_size = job.get("batch_size"),
+            tile_size = job.get("tile_size"),
+            tile_overlap = job.get("tile_overlap", TILE_OVERLAP),
+            # resume: bỏ qua ảnh đã xong trong lần chạy trước
+            incremental = True
+        )
+
+    def start_auto_label(self, image_dir, model_path, label_dir, conf = 0.7, batch_size = None, tile_size = None, tile_overlap = TILE_OVERLAP, incremental = False):
+        # auto label đọc/ghi cùng thư mục label -> ghi hết bản lưu tay trước
+        self.label_saver.flush()
         #show loading
         self.loading = LoadingDialog(self)
         self.loading.show()
@@ -772,22 +945,49 @@ class MainWindow(QMainWindow):
             self.logic,
             image_dir, 
             model_path,
-            label_dir
+            label_dir,
+            conf = conf,
+            batch_size = batch_size,
+            incremental = incremental,
+            workers = None,
+            tile_size = tile_size,
+            tile_overlap = tile_overlap
         )
         self.worker.finished_signal.connect(self.on_auto_label_done)
         self.worker.error_signal.connect(self.on_auto_label_error)
+        self.worker.stats_signal.connect(self.on_auto_label_stats)
+        self.worker.progress_signal.connect(self.loading.update_progress)
+        self.worker.cancelled_signal.connect(self.on_auto_label_cancelled)
+        self.loading.cancel_requested.connect(self.worker.cancel)
         self.worker.start()
 
     def on_auto_label_done(self, total):
-        self.loading.close()
+        self.loading.finish()
         QMessageBox.information(
             self,
             "Done",
             f"✅ Auto label hoàn tất\n{total} ảnh"
         )
 
+    def on_auto_label_cancelled(self, done):
+        self.loading.finish()
+        log.info(f"Auto label cancelled, {done} images labeled")
+        QMessageBox.information(
+            self,
+            "Cancelled",
+            f"Auto label đã dừng\n{done} ảnh đã label xong"
+        )
+
+    def on_auto_label_stats(self, stats):
+        self.statusBar().showMessage(
+            f"Auto label: decode {stats.get('decode', 0):.1f}s | "
+            f"infer {stats.get('infer', 0):.1f}s | "
+            f"write {stats.get('write', 0):.1f}s | "
+            f"total {stats.get('wall', 0):.1f}s"
+        )
+
     def on_auto_label_error(self, error):
-        self.loading.close()
+        self.loading.finish()
         QMessageBox.critical(
             self,
             "Error",
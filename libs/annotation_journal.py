@@ -0,0 +1,262 @@
+import json
+import os
+import time
+
+from widgets.edit_history import apply_cmd
+from gui.logger import setup_logger
+
+log = setup_logger()
+
+# mỗi process 1 journal (journal-<pid>-<time>.jsonl), khóa độc quyền khi đang chạy
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".tplabel", "journal")
+
+
+def lock_file(f):
+    # khóa không chờ; khóa tự nhả khi file đóng hoặc process chết
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def rect_list(rect):
+    return [rect.x(), rect.y(), rect.width(), rect.height()]
+
+
+def box_record(box):
+    return {
+        "label": int(box["label"]),
+        "label_name": box.get("label_name", ""),
+        "rect": rect_list(box["rect"]),
+    }
+
+
+def cmd_record(cmd):
+    # command của EditHistory -> dict JSON (QRect -> [x, y, w, h])
+    op = cmd["op"]
+    if op in ("create", "delete"):
+        return {"op": op, "index": cmd["index"], "box": box_record(cmd["box"])}
+    if op == "rect":
+        return {"op": op, "index": cmd["index"], "old": rect_list(cmd["old"]), "new": rect_list(cmd["new"])}
+    if op == "label":
+        return {"op": op, "index": cmd["index"], "old": list(cmd["old"]), "new": list(cmd["new"])}
+    return {
+        "op": op,
+        "old": [box_record(b) for b in cmd["old"]],
+        "new": [box_record(b) for b in cmd["new"]],
+    }
+
+
+def parse_yolo(text, w, h):
+    boxes = []
+    for line in text.splitlines():
+        parts = line.strip().split()
+        if len(parts) != 5:
+            continue
+        x, y, bw, bh = (float(v) for v in parts[1:])
+        rect = [(x - bw / 2) * w, (y - bh / 2) * h, bw * w, bh * h]
+        boxes.append({"label": int(parts[0]), "label_name": "", "rect": rect})
+    return boxes
+
+
+def format_yolo(boxes, w, h):
+    lines = []
+    for box in boxes:
+        x, y, bw, bh = box["rect"]
+        lines.append(
+            f"{int(box['label'])} {(x + bw / 2) / w:.6f} {(y + bh / 2) / h:.6f} "
+            f"{bw / w:.6f} {bh / h:.6f}\n"
+        )
+    return "".join(lines)
+
+
+def read_text(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def replay(lines, states):
+    # states: label_path -> {"text", "boxes", "size"}; boxes None = đã lưu
+    current = None
+    for line in lines:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            # dòng cuối ghi dở lúc crash
+            break
+        action = rec["a"]
+        if action == "open":
+            current = rec
+            state = states.get(rec["label"])
+            if state is None or state["boxes"] is None:
+                base = state["text"] if state else read_text(rec["label"])
+                states[rec["label"]] = {
+                    "text": base,
+                    "boxes": parse_yolo(base, rec["w"], rec["h"]),
+                    "size": (rec["w"], rec["h"]),
+                }
+        elif action in ("edit", "undo", "redo") and current is not None:
+            state = states[current["label"]]
+            try:
+                apply_cmd(state["boxes"], rec["cmd"], reverse=(action == "undo"))
+            except (IndexError, KeyError):
+                log.warning(f"Journal replay mismatch: {current['label']}")
+        elif action == "saved":
+            states[rec["label"]] = {"text": rec["text"], "boxes": None, "size": None}
+            current = None
+        elif action == "discard":
+            states.pop(rec["label"], None)
+            current = None
+    return states
+
+
+def pending_writes(states):
+    # {label_path: text} khác với nội dung trên đĩa
+    pending = {}
+    for label_path, state in states.items():
+        if state["boxes"] is not None:
+            text = format_yolo(state["boxes"], *state["size"])
+        else:
+            text = state["text"]
+        # bản đã lưu nhưng chưa kịp ghi xuống đĩa cũng cần ghi lại
+        if text != read_text(label_path):
+            pending[label_path] = text
+    return pending
+
+
+class AnnotationJournal:
+    # nhật ký append-only: mỗi thay đổi box chỉ append 1 dòng JSON,
+    # không ghi lại cả file. Crash -> lần mở sau replay lên file label.
+    # Bản ghi: open (ảnh + kích thước), edit/undo/redo (command), saved (nội dung đã lưu)
+    def __init__(self, folder=JOURNAL_DIR):
+        self.folder = folder
+        # thêm thời điểm mở: pid có thể bị dùng lại sau khi process cũ crash
+        self.path = os.path.join(folder, f"journal-{os.getpid()}-{time.time_ns()}.jsonl")
+        self.file = None
+        # journal của process đã chết, giữ khóa tới khi xử lý xong
+        self.claimed = []
+        self.current = None
+        self.opened = False
+        self.dirty = set()
+        # đã lưu nhưng file label chưa ghi xong xuống đĩa
+        self.unwritten = set()
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        if not lock_file(self.file):
+            self.file.close()
+            self.file = None
+            raise OSError(f"Journal is locked: {self.path}")
+
+    def append(self, record):
+        if self.file is None:
+            return
+        self.file.write(json.dumps(record) + "\n")
+        # flush xuống OS là đủ khi app crash, không fsync từng phím
+        self.file.flush()
+
+    def open(self, label_path, width, height):
+        # chỉ ghi bản ghi open khi ảnh có thay đổi đầu tiên
+        self.current = {"a": "open", "label": label_path, "w": width, "h": height} if label_path else None
+        self.opened = False
+
+    def record(self, action, cmd):
+        if self.current is None:
+            return
+        if not self.opened:
+            self.append(self.current)
+            self.opened = True
+        self.append({"a": action, "cmd": cmd_record(cmd)})
+        self.dirty.add(self.current["label"])
+
+    def saved(self, label_path, text):
+        self.append({"a": "saved", "label": label_path, "text": text})
+        self.dirty.discard(label_path)
+        self.unwritten.add(label_path)
+        if self.current is not None and self.current["label"] == label_path:
+            self.opened = False
+
+    def written(self, label_path):
+        self.unwritten.discard(label_path)
+
+    def write_failed(self, label_path):
+        # ghi lỗi -> journal là bản duy nhất còn lại, không được compact
+        self.unwritten.discard(label_path)
+        self.dirty.add(label_path)
+
+    def discard(self, label_path):
+        self.append({"a": "discard", "label": label_path})
+        self.dirty.discard(label_path)
+        if self.current is not None and self.current["label"] == label_path:
+            self.opened = False
+
+    def compact(self):
+        # mọi ảnh đã lưu và file label đã ghi xong -> journal rỗng lại
+        if self.file is None or self.dirty or self.unwritten:
+            return
+        self.file.seek(0)
+        self.file.truncate()
+
+    def close(self):
+        # sạch -> xóa file; còn thay đổi -> để lại cho lần mở sau khôi phục
+        if self.file is None:
+            return
+        self.compact()
+        empty = self.file.tell() == 0
+        self.file.close()
+        self.file = None
+        if empty:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def recover(self):
+        # replay journal của các process không còn chạy (khóa lấy được),
+        # trả về {label_path: text} cần ghi lại
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return {}
+        paths = [
+            os.path.join(self.folder, name) for name in names
+            if name.startswith("journal-") and name.endswith(".jsonl")
+        ]
+        paths = [p for p in paths if p != self.path]
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        states = {}
+        for path in paths:
+            try:
+                f = open(path, "a+", encoding="utf-8")
+            except OSError:
+                continue
+            if not lock_file(f):
+                # instance khác đang dùng
+                f.close()
+                continue
+            self.claimed.append(f)
+            f.seek(0)
+            replay(f.readlines(), states)
+        return pending_writes(states)
+
+    def finish_recovery(self):
+        # nội dung khôi phục đã vào journal mới -> xóa journal cũ
+        for f in self.claimed:
+            path = f.name
+            f.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.claimed = []
@@ -0,0 +1,38 @@
+import os
+import stat
+import tempfile
+
+# đọc umask 1 lần lúc import (os.umask đổi giá trị toàn process, không thread-safe)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def target_mode(path):
+    # mkstemp tạo file 0600 -> giữ quyền của file cũ, file mới thì như open(..., "w")
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    # ghi ra file tạm cùng thư mục rồi rename, không bao giờ để lại file ghi dở
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".",
+        suffix=".tmp",
+        dir=folder
+    )
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
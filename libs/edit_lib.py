@@ -1,5 +1,5 @@
-import os
-from PyQt5.QtWidgets import QFileDialog, QAction
+from PyQt5.QtWidgets import QAction
+from PyQt5.QtGui import QKeySequence
 
 class EditLib:
 
@@ -13,18 +13,24 @@ class EditLib:
         self.action_undo = QAction("Undo", self.main)
         self.action_redo = QAction("Redo", self.main)
 
+        self.action_undo.setShortcut(QKeySequence.Undo)
+        self.action_redo.setShortcut(QKeySequence("Ctrl+Y"))
+
         self.action_undo.triggered.connect(self.undo)
         self.action_redo.triggered.connect(self.redo)
+        self.menu.aboutToShow.connect(self.update_actions)
 
         self.menu.addAction(self.action_undo)
         self.menu.addAction(self.action_redo)
 
+    def update_actions(self):
+        history = self.main.canvas.history
+        self.action_undo.setEnabled(history.can_undo())
+        self.action_redo.setEnabled(history.can_redo())
+
+    # history riêng của ảnh đang mở
     def undo(self):
-        if self.main.canvas.boxes:
-            self.main.canvas.boxes.pop()
-            self.main.canvas.update()
+        self.main.canvas.undo()
 
     def redo(self):
-        if self.main.canvas.boxes:
-            self.main.canvas.boxes.append(self.main.canvas.boxes[-1])
-            self.main.canvas.update()
+        self.main.canvas.redo()
@@ -1,8 +1,7 @@
-import os
 from PyQt5.QtWidgets import QFileDialog, QAction
-class FileLib:
+from libs.image_scan import scan_images
 
-    IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+class FileLib:
 
     def __init__(self, main_window):
         self.main = main_window
@@ -12,28 +11,25 @@ class FileLib:
     def create_actions(self):
         self.open_ok_action = QAction("Open OK Folder", self.main)
         self.open_ng_action = QAction("Open NG Folder", self.main)
+        self.resume_auto_action = QAction("Resume Auto Label", self.main)
         self.exit_action = QAction("Exit", self.main)
 
         self.open_ok_action.triggered.connect(self.open_ok_folder)
         self.open_ng_action.triggered.connect(self.open_ng_folder)
+        self.resume_auto_action.triggered.connect(self.main.resume_auto_label)
         self.exit_action.triggered.connect(self.main.close)
 
         self.menu.addAction(self.open_ok_action)
         self.menu.addAction(self.open_ng_action)
+        self.menu.addAction(self.resume_auto_action)
         self.menu.addSeparator()
         self.menu.addAction(self.exit_action)
 
     def open_folder(self, title):
         return QFileDialog.getExistingDirectory(self.main, title)
 
-    def load_images(self, folder):
-        if not folder:
-            return []
-        return sorted(
-            os.path.join(folder, f)
-            for f in os.listdir(folder)
-            if f.lower().endswith(self.IMAGE_EXTS)
-        )
+    def load_images(self, folder, recursive=False):
+        return scan_images(folder, recursive=recursive)
     
     def open_ok_folder(self):
         self.main.select_ok_folder()
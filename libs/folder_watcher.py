@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from libs.image_scan import scan_dir
+
+
+class FolderWatcher(QObject):
+    # camera ghi ảnh liên tục: gom các thay đổi (debounce) rồi báo 1 lần
+    # danh sách ảnh mới, không load lại folder
+    images_added = pyqtSignal(list)
+    # (generation, tên ảnh mới) từ thread liệt kê
+    _listed = pyqtSignal(int, list)
+
+    def __init__(self, parent=None, debounce_ms=300, max_wait_ms=2000):
+        super().__init__(parent)
+        self.folder = None
+        self.known = set()
+        self.max_wait = max_wait_ms / 1000.0
+        self.first_change = None
+        # đổi folder/stop -> tăng generation, bỏ kết quả liệt kê cũ
+        self.generation = 0
+        self.scanning = False
+        self.rescan = False
+        self._listed.connect(self.on_listed)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.collect)
+
+    def watch(self, folder, images):
+        self.stop()
+        self.folder = folder
+        self.known = set(os.path.basename(p) for p in images)
+        self.watcher.addPath(folder)
+
+    def stop(self):
+        dirs = self.watcher.directories()
+        if dirs:
+            self.watcher.removePaths(dirs)
+        self.timer.stop()
+        self.first_change = None
+        self.folder = None
+        self.known = set()
+        self.generation += 1
+        self.scanning = False
+        self.rescan = False
+
+    def on_changed(self, _path):
+        now = time.monotonic()
+        if self.first_change is None:
+            self.first_change = now
+        # burst liên tục: vẫn flush sau max_wait
+        if now - self.first_change >= self.max_wait:
+            self.collect()
+        else:
+            self.timer.start()
+
+    def collect(self):
+        self.timer.stop()
+        self.first_change = None
+        if not self.folder:
+            return
+        if self.scanning:
+            # đang liệt kê: liệt kê lại khi xong
+            self.rescan = True
+            return
+        self.scanning = True
+        # known chỉ bị sửa ở on_listed (sau khi thread xong) hoặc thay set mới ở watch/stop
+        threading.Thread(
+            target=self.list_new,
+            args=(self.generation, self.folder, self.known),
+            daemon=True
+        ).start()
+
+    # thread nền: scandir folder hàng chục nghìn ảnh không chặn GUI
+    def list_new(self, generation, folder, known):
+        try:
+            names, _ = scan_dir(folder)
+        except OSError:
+            names = []
+        self._listed.emit(generation, sorted(name for name in names if name not in known))
+
+    def on_listed(self, generation, new):
+        if generation != self.generation:
+            return
+        self.scanning = False
+        if new:
+            self.known.update(new)
+            self.images_added.emit([os.path.join(self.folder, name) for name in new])
+        if self.rescan:
+            self.rescan = False
+            self.collect()
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QRunnable, QThreadPool
+from PyQt5.QtGui import QImage, QImageReader
+
+
+def image_bytes(image):
+    if hasattr(image, "sizeInBytes"):
+        return image.sizeInBytes()
+    return image.byteCount()
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, prefetcher, path):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.path = path
+
+    def run(self):
+        # ảnh rất lớn do canvas tự đọc theo tile, không decode cả ảnh vào cache
+        size = QImageReader(self.path).size()
+        if size.isValid() and size.width() * size.height() >= self.prefetcher.max_pixels:
+            self.prefetcher.store(self.path, QImage())
+            return
+        # QImage decode được ở thread khác, QPixmap thì không
+        self.prefetcher.store(self.path, QImage(self.path))
+
+
+class ImagePrefetcher:
+    # decode trước K ảnh trước/sau ảnh hiện tại, LRU giới hạn theo MB
+    def __init__(self, budget_mb=512, radius=2, threads=2, max_pixels=40_000_000):
+        self.budget = budget_mb * 1024 * 1024
+        self.max_pixels = max_pixels
+        self.radius = radius
+        self.cache = OrderedDict()
+        self.total = 0
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(threads)
+
+    def get(self, path):
+        with self.lock:
+            image = self.cache.get(path)
+            if image is not None:
+                self.cache.move_to_end(path)
+            return image
+
+    def store(self, path, image):
+        with self.lock:
+            self.pending.discard(path)
+            if image.isNull() or path in self.cache:
+                return
+            self.cache[path] = image
+            self.total += image_bytes(image)
+            self.evict()
+
+    def evict(self):
+        while len(self.cache) > 1 and self.total > self.budget:
+            _, image = self.cache.popitem(last=False)
+            self.total -= image_bytes(image)
+
+    def prefetch(self, paths):
+        for path in paths:
+            with self.lock:
+                if path in self.cache or path in self.pending:
+                    continue
+                self.pending.add(path)
+            self.pool.start(_DecodeTask(self, path))
+
+    def prefetch_around(self, images, index):
+        # ưu tiên ảnh gần nhất, xen kẽ sau / trước
+        paths = []
+        for step in range(1, self.radius + 1):
+            for i in (index + step, index - step):
+                if 0 <= i < len(images):
+                    paths.append(images[i])
+        self.prefetch(paths)
+
+    def discard(self, path):
+        with self.lock:
+            image = self.cache.pop(path, None)
+            if image is not None:
+                self.total -= image_bytes(image)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.total = 0
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import time
+
+from libs.atomic_io import atomic_write_text
+
+# dùng chung cho viewer và auto label
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".bmp"})
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".tplabel", "index")
+# mtime của thư mục vừa thay đổi chưa đáng tin (FS/NFS làm tròn mtime)
+MTIME_SETTLE_NS = 2 * 10 ** 9
+
+
+def is_image(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTS
+
+
+def scan_dir(folder):
+    # 1 lần scandir: tên ảnh + thư mục con, không stat từng file
+    images, subdirs = [], []
+    with os.scandir(folder) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file() and is_image(entry.name):
+                    images.append(entry.name)
+            except OSError:
+                continue
+    return images, subdirs
+
+
+class DirectoryIndex:
+    # cache trên đĩa: mỗi thư mục lưu mtime + danh sách ảnh/thư mục con,
+    # thư mục có mtime không đổi thì không cần scandir lại
+    def __init__(self, folder, recursive=False, index_dir=INDEX_DIR):
+        self.folder = os.path.abspath(folder)
+        self.recursive = recursive
+        key = f"{os.path.realpath(self.folder)}|{int(recursive)}"
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+        self.path = os.path.join(index_dir, name)
+        self.dirs = {}
+        self.changed = False
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("folder") == self.folder:
+                self.dirs = data.get("dirs", {})
+        except (OSError, ValueError):
+            self.dirs = {}
+
+    def save(self):
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write_text(self.path, json.dumps({
+                "version": 1,
+                "folder": self.folder,
+                "dirs": self.dirs,
+            }))
+        except OSError:
+            pass
+
+    def entry(self, rel):
+        folder = os.path.join(self.folder, rel) if rel else self.folder
+        mtime = os.stat(folder).st_mtime_ns
+        cached = self.dirs.get(rel)
+        if cached and cached["mtime"] == mtime:
+            return cached
+        images, subdirs = scan_dir(folder)
+        settled = time.time_ns() - mtime > MTIME_SETTLE_NS
+        cached = {
+            "mtime": mtime if settled else None,
+            "images": images,
+            "subdirs": subdirs,
+        }
+        self.dirs[rel] = cached
+        self.changed = True
+        return cached
+
+    def scan(self):
+        paths = []
+        seen = set()
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            seen.add(rel)
+            try:
+                entry = self.entry(rel)
+            except OSError:
+                continue
+            folder = os.path.join(self.folder, rel) if rel else self.folder
+            paths.extend(os.path.join(folder, name) for name in entry["images"])
+            if self.recursive:
+                stack.extend(
+                    os.path.join(rel, name) if rel else name
+                    for name in entry["subdirs"]
+                )
+        # bỏ thư mục đã bị xóa khỏi index
+        stale = [rel for rel in self.dirs if rel not in seen]
+        for rel in stale:
+            del self.dirs[rel]
+            self.changed = True
+        return paths
+
+
+def scan_images(folder, recursive=False, use_index=True):
+    if not folder or not os.path.isdir(folder):
+        return []
+    index = DirectoryIndex(folder, recursive)
+    if use_index:
+        index.load()
+    paths = index.scan()
+    if use_index:
+        index.save()
+    return sorted(paths)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from libs.atomic_io import atomic_write_text
+
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".tplabel", "label_index")
+COLUMNS = ("image_id", "class_id", "cx", "cy", "w", "h")
+DTYPES = {"image_id": np.int32, "class_id": np.int32}
+
+
+def empty_columns():
+    return {name: np.empty(0, dtype=DTYPES.get(name, np.float32)) for name in COLUMNS}
+
+
+def parse_text(text):
+    # YOLO -> mảng (N, 5): class cx cy w h; chỉ nhận dòng đúng 5 cột
+    # (như load_label_file), dòng 6 cột (có conf...) bị bỏ chứ không dồn cột
+    rows = [parts for parts in (line.split() for line in text.splitlines()) if len(parts) == 5]
+    try:
+        return np.array(rows, dtype=np.float32).reshape(-1, 5)
+    except ValueError:
+        pass
+    # có giá trị không phải số: lọc từng dòng
+    good = []
+    for parts in rows:
+        try:
+            good.append([float(v) for v in parts])
+        except ValueError:
+            continue
+    return np.array(good, dtype=np.float32).reshape(-1, 5)
+
+
+def parse_label(path):
+    try:
+        with open(path, "r") as f:
+            text = f.read()
+    except OSError:
+        return np.empty((0, 5), dtype=np.float32)
+    return parse_text(text)
+
+
+def save_array(path, array):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class LabelIndex:
+    # toàn bộ label của 1 folder dạng cột (image_id, class_id, cx, cy, w, h),
+    # lưu .npy và mở bằng mmap -> query cả triệu box trong vài ms.
+    # refresh chỉ parse lại file .txt có mtime/size thay đổi.
+    def __init__(self, labels_dir, index_dir=INDEX_DIR, workers=8):
+        self.labels_dir = os.path.abspath(labels_dir)
+        key = os.path.realpath(self.labels_dir)
+        self.path = os.path.join(index_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+        self.workers = workers
+        # files: tên file -> [mtime_ns, size, image_id]; names[image_id] = tên file
+        self.files = {}
+        self.names = []
+        self.columns = empty_columns()
+
+    def meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def load(self):
+        try:
+            with open(self.meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("folder") != self.labels_dir:
+                return
+            columns = {
+                name: np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+                for name in COLUMNS
+            }
+        except (OSError, ValueError):
+            return
+        self.files = meta["files"]
+        self.names = meta["names"]
+        self.columns = columns
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        for name in COLUMNS:
+            save_array(os.path.join(self.path, name + ".npy"), self.columns[name])
+        # meta ghi sau cùng: crash giữa chừng thì lần sau build lại
+        atomic_write_text(self.meta_path(), json.dumps({
+            "version": 1,
+            "folder": self.labels_dir,
+            "files": self.files,
+            "names": self.names,
+        }))
+
+    def scan(self):
+        current = {}
+        with os.scandir(self.labels_dir) as it:
+            for entry in it:
+                name = entry.name
+                if not name.endswith(".txt") or name == "classes.txt":
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                current[name] = (st.st_mtime_ns, st.st_size)
+        return current
+
+    def refresh(self):
+        # trả về số file phải parse lại
+        if not self.files:
+            self.load()
+        current = self.scan()
+        changed = [
+            name for name, (mtime, size) in current.items()
+            if name not in self.files or self.files[name][:2] != [mtime, size]
+        ]
+        removed = [name for name in self.files if name not in current]
+        if not changed and not removed:
+            return 0
+
+        stale = [self.files[name][2] for name in changed + removed if name in self.files]
+        for name in removed:
+            self.names[self.files.pop(name)[2]] = None
+
+        paths = [os.path.join(self.labels_dir, name) for name in changed]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            parsed = list(pool.map(parse_label, paths))
+
+        keep = ~np.isin(self.columns["image_id"], np.array(stale, dtype=np.int32))
+        parts = {name: [np.asarray(self.columns[name])[keep]] for name in COLUMNS}
+        for name, rows in zip(changed, parsed):
+            entry = self.files.get(name)
+            if entry is None:
+                image_id = len(self.names)
+                self.names.append(name)
+            else:
+                image_id = entry[2]
+            mtime, size = current[name]
+            self.files[name] = [mtime, size, image_id]
+            parts["image_id"].append(np.full(len(rows), image_id, dtype=np.int32))
+            parts["class_id"].append(rows[:, 0].astype(np.int32))
+            for i, col in enumerate(("cx", "cy", "w", "h"), 1):
+                parts[col].append(rows[:, i])
+
+        self.columns = {
+            name: np.concatenate(parts[name]).astype(DTYPES.get(name, np.float32), copy=False)
+            for name in COLUMNS
+        }
+        self.save()
+        self.load()
+        return len(changed)
+
+    # query
+    def box_count(self):
+        return len(self.columns["class_id"])
+
+    def class_counts(self, num_classes=0):
+        return np.bincount(self.columns["class_id"], minlength=num_classes)
+
+    def images_with_class(self, class_id):
+        ids = np.unique(self.columns["image_id"][self.columns["class_id"] == class_id])
+        return [self.names[i] for i in ids]
+
+    def unlabeled(self, image_paths):
+        # ảnh không có file label hoặc file label rỗng
+        labeled = set(self.names[i] for i in np.unique(self.columns["image_id"]))
+        return [
+            p for p in image_paths
+            if os.path.splitext(os.path.basename(p))[0] + ".txt" not in labeled
+        ]
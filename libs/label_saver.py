@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from libs.atomic_io import atomic_write_text
+from gui.logger import setup_logger
+
+log = setup_logger()
+
+
+class LabelSaver(QObject):
+    # ghi label ở thread nền (write-behind): GUI chỉ đưa text vào hàng đợi,
+    # lưu nhiều lần cùng 1 file trước khi kịp ghi -> chỉ ghi bản mới nhất
+    pending_changed = pyqtSignal(int)
+    saved_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = OrderedDict()
+        self.writing = None
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def save(self, path, text):
+        with self.cond:
+            self.pending[path] = text
+            self.pending.move_to_end(path)
+            count = self.count()
+            self.cond.notify_all()
+        self.pending_changed.emit(count)
+
+    def count(self):
+        return len(self.pending) + (1 if self.writing is not None else 0)
+
+    def pending_count(self):
+        with self.cond:
+            return self.count()
+
+    def pending_text(self, path):
+        # đọc lại file đang chờ ghi -> lấy nội dung mới nhất trong hàng đợi
+        with self.cond:
+            if path in self.pending:
+                return self.pending[path]
+            if self.writing is not None and self.writing[0] == path:
+                return self.writing[1]
+            return None
+
+    def loop(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                self.writing = self.pending.popitem(last=False)
+            path, text = self.writing
+            try:
+                atomic_write_text(path, text)
+                self.saved_signal.emit(path)
+            except OSError as e:
+                log.error(f"Save label failed: {path}: {e}")
+                self.error_signal.emit(path, str(e))
+            with self.cond:
+                self.writing = None
+                count = self.count()
+                self.cond.notify_all()
+            self.pending_changed.emit(count)
+
+    def flush(self, timeout=None):
+        # chờ ghi hết (đóng app), trả về False nếu quá timeout
+        with self.cond:
+            return self.cond.wait_for(lambda: self.count() == 0, timeout)
@@ -1,9 +1,16 @@
-from PyQt5.QtWidgets import QAction
+import os
+import time
+
+from PyQt5.QtWidgets import QAction, QMessageBox, QApplication
+from PyQt5.QtCore import Qt
+
+from libs.label_index import LabelIndex
 
 
 class ViewLib:
     def __init__(self, main_window):
         self.main = main_window
+        self.label_index = None
         self.menu = self.main.menuBar().addMenu("View")
 
         self.view_actions()
@@ -12,15 +19,61 @@ class ViewLib:
     def view_actions(self):
         self.action_zoom_in = QAction("Zoom In", self.main)
         self.action_zoom_out = QAction("Zoom Out", self.main)
+        self.action_stats = QAction("Label Statistics", self.main)
 
         self.action_zoom_in.triggered.connect(self.zoom_in)
         self.action_zoom_out.triggered.connect(self.zoom_out)
+        self.action_stats.triggered.connect(self.show_label_stats)
 
         self.menu.addAction(self.action_zoom_in)
         self.menu.addAction(self.action_zoom_out)
+        self.menu.addSeparator()
+        self.menu.addAction(self.action_stats)
 
     def zoom_in(self):
         print("Zoom In action")
 
     def zoom_out(self):
         print("Zoom Out action")
+
+    def show_label_stats(self):
+        labels_dir = self.main.labels_dir
+        if not labels_dir:
+            QMessageBox.warning(
+                self.main,
+                "No Labels Folder",
+                "Please select Labels Folder first"
+            )
+            return
+        # label đang ghi nền phải xuống đĩa trước khi index
+        self.main.label_saver.flush()
+        if self.label_index is None or self.label_index.labels_dir != os.path.abspath(labels_dir):
+            self.label_index = LabelIndex(labels_dir)
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            start = time.perf_counter()
+            parsed = self.label_index.refresh()
+            counts = self.label_index.class_counts(len(self.main.labels))
+            unlabeled = self.label_index.unlabeled(self.main.current_images)
+            elapsed = (time.perf_counter() - start) * 1000
+        except (OSError, ValueError) as e:
+            # ValueError: class id âm trong file label (np.bincount)
+            QApplication.restoreOverrideCursor()
+            QMessageBox.critical(self.main, "Error", f"Failed to index labels:\n{e}")
+            return
+        QApplication.restoreOverrideCursor()
+
+        lines = []
+        for class_id, count in enumerate(counts.tolist()):
+            name = self.main.labels[class_id] if class_id < len(self.main.labels) else str(class_id)
+            lines.append(f"{name}: {count}")
+        QMessageBox.information(
+            self.main,
+            "Label Statistics",
+            f"Label files: {len(self.label_index.files)}\n"
+            f"Boxes: {self.label_index.box_count()}\n"
+            f"Unlabeled images: {len(unlabeled)} / {len(self.main.current_images)}\n\n"
+            + "\n".join(lines)
+            + f"\n\n({parsed} files re-parsed, {elapsed:.0f} ms)"
+        )
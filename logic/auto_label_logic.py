@@ -1,61 +1,231 @@
-from ultralytics import YOLO
 from PIL import Image
 import os
 import pathlib
+import threading
+from libs.image_scan import scan_images
+from logic.auto_label_pipeline import AutoLabelPipeline
+from logic.auto_label_pool import AutoLabelPool
+from logic.model_cache import ModelCache
+from logic.tiled_inference import TiledPredictor
+from logic.label_manifest import LabelManifest, file_hash, load_job, save_job, clear_job
+from gui.logger import setup_logger
+log = setup_logger()
 
 
 temp = pathlib.PosixPath
 pathlib.PosixPath = pathlib.WindowsPath
+
+# chế độ tile (chọn ở dialog confirm): kích thước tile + tỉ lệ chồng lấn
+TILE_SIZE = 1024
+TILE_OVERLAP = 0.2
+
+
+# ultralytics/torch chỉ import khi thật sự cần auto label (mở app nhanh)
+def load_yolo(model_path):
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def prewarm():
+    import ultralytics  # noqa: F401
+
+
+def available_memory():
+    # bytes of free RAM, None if it can't be detected
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
 class AutoLabelLogic:
+    DEFAULT_BATCH_SIZE = 8
+    MAX_BATCH_SIZE = 64
+    # fraction of free RAM a batch may use (decoded image + model buffers)
+    MEMORY_FRACTION = 0.25
+    BYTES_PER_PIXEL = 3 * 4
+    DECODE_WORKERS = 4
+    WRITE_WORKERS = 2
+    QUEUE_SIZE = 2
+    # số core cho mỗi process khi chạy multi-process
+    CORES_PER_WORKER = 8
+    MAX_WORKERS = 8
+
     def __init__(self):
         self.model = None
-        
+        self.model_path = None
+        self.model_cache = ModelCache(load_yolo)
+        self.stats = {}
+        self.cancel_event = threading.Event()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancel_event.set()
+
     def load_model(self, model_path):
-        if self.model is None:
-            if not model_path:
-                raise ValueError("Model path is not set.")
-            self.model = YOLO(model_path)
+        if not model_path:
+            raise ValueError("Model path is not set.")
+        self.model = self.model_cache.get(model_path)
+        self.model_path = model_path
+
+    def auto_batch_size(self, image_path):
+        free = available_memory()
+        if not free:
+            return self.DEFAULT_BATCH_SIZE
+        with Image.open(image_path) as img:
+            w, h = img.size
+        # batches in flight: queued + inferring + being decoded
+        in_flight = self.QUEUE_SIZE + 2
+        per_image = max(1, w * h * self.BYTES_PER_PIXEL * in_flight)
+        batch = int(free * self.MEMORY_FRACTION // per_image)
+        return max(1, min(batch, self.MAX_BATCH_SIZE))
+
+    def default_workers(self):
+        cores = os.cpu_count() or 1
+        return max(1, min(cores // self.CORES_PER_WORKER, self.MAX_WORKERS))
 
-    def run(self, image_dir, model_path, label_dir, conf = 0.7):
+    def run(self, image_dir, model_path, label_dir, conf = 0.7, batch_size = None, incremental = False, workers = 1, progress = None, tile_size = None, tile_overlap = TILE_OVERLAP):
 
         if not os.path.exists(label_dir):
             os.makedirs(label_dir)
 
         self.load_model(model_path)
+        self.stats = {}
+        self.cancel_event.clear()
+        self.cancelled = False
 
-        # tạo classes nếu không có 
+        # tạo classes nếu không có
         classes_path = os.path.join(label_dir, "classes.txt")
         if not os.path.exists(classes_path):
             with open(classes_path, "w", encoding="utf-8") as f:
                 for i in range(len(self.model.names)):
                     f.write(self.model.names[i] + "\n")
-        images = [
-            f for f in os.listdir(image_dir)
-            if f.lower().endswith((".jpg", ".png", ".jpeg"))
+        jobs = [
+            (
+                image_path,
+                os.path.join(
+                    label_dir,
+                    os.path.splitext(os.path.basename(image_path))[0] + ".txt"
+                )
+            )
+            for image_path in scan_images(image_dir)
         ]
 
-        for filename in images:
-            image_path = os.path.join(image_dir, filename)
-            results = self.model(image_path, conf=conf)
+        manifest = LabelManifest(label_dir)
+        model_hash = file_hash(model_path)
+        if tile_size:
+            # label chạy tile khác label cả frame
+            model_hash = f"{model_hash}:tile{tile_size}/{tile_overlap}"
+        # incremental: bỏ qua ảnh không đổi đã label bằng cùng model + conf
+        if incremental:
+            total = len(jobs)
+            jobs = [
+                job for job in jobs
+                if not manifest.is_up_to_date(job[0], job[1], model_hash, conf)
+            ]
+            log.info(f"Incremental auto label: {total - len(jobs)} up to date, {len(jobs)} to label")
+        if not jobs:
+            return 0
 
-            with Image.open(image_path) as img:
-                w, h = img.size
+        # batch size theo RAM còn trống
+        if not batch_size:
+            batch_size = self.auto_batch_size(jobs[0][0])
 
-            label_path = os.path.join(
-                label_dir,
-                os.path.splitext(filename)[0] + ".txt"
-            )
-            with open(label_path, "w") as f:
-                    for r in results:
-                        for box in r.boxes:
-                            cls_id = int(box.cls[0])
-                            x, y, bw, bh = box.xywh[0]
+        # job file: để resume nếu app bị tắt giữa chừng
+        save_job(label_dir, {
+            "image_dir": image_dir,
+            "model_path": model_path,
+            "label_dir": label_dir,
+            "conf": conf,
+            "batch_size": batch_size,
+            "tile_size": tile_size,
+            "tile_overlap": tile_overlap,
+            "total": len(jobs),
+        })
 
-                            f.write(
-                                f"{cls_id} "
-                                f"{x/w:.6f} {y/h:.6f} "
-                                f"{bw/w:.6f} {bh/h:.6f}\n"
-                            )
-        return len(images)
+        done_lock = threading.Lock()
+        done = [0]
+
+        def on_done(image_path, label_path):
+            manifest.mark_done(image_path, model_hash, conf)
+            with done_lock:
+                done[0] += 1
+                count = done[0]
+            if progress is not None:
+                progress(count, len(jobs), pipeline.stats)
+
+        if workers is None:
+            workers = self.default_workers()
+        workers = min(workers, max(1, len(jobs) // batch_size))
+        if workers > 1:
+            log.info(f"Auto label with {workers} processes")
+            pipeline = AutoLabelPool(
+                model_path,
+                conf,
+                batch_size,
+                workers,
+                on_done=lambda image_path: on_done(image_path, None),
+                cancel_event=self.cancel_event,
+                tile_size=tile_size,
+                tile_overlap=tile_overlap
+            )
+        else:
+            tiler = None
+            if tile_size:
+                tiler = TiledPredictor(self.model, conf, tile_size=tile_size, overlap=tile_overlap)
+            pipeline = AutoLabelPipeline(
+                self.model,
+                conf,
+                batch_size,
+                decode_workers=self.DECODE_WORKERS,
+                write_workers=self.WRITE_WORKERS,
+                queue_size=self.QUEUE_SIZE,
+                on_done=on_done,
+                cancel_event=self.cancel_event,
+                tiler=tiler
+            )
+        try:
+            pipeline.run(jobs)
+            self.cancelled = self.cancel_event.is_set()
+            # cancel: giữ job file để có thể resume
+            if not self.cancelled:
+                clear_job(label_dir)
+        finally:
+            manifest.save()
+            self.stats = dict(pipeline.stats)
+            log.info(
+                "Auto label stages | "
+                f"decode={self.stats['decode']:.2f}s "
+                f"infer={self.stats['infer']:.2f}s "
+                f"write={self.stats['write']:.2f}s "
+                f"wall={self.stats['wall']:.2f}s "
+                f"images={self.stats['images']}"
+            )
+        if self.cancelled:
+            log.info(f"Auto label cancelled after {done[0]} / {len(jobs)} images")
+        return done[0]
 
+    @staticmethod
+    def pending_job(label_dir):
+        return load_job(label_dir)
 
+    def resume(self, label_dir, workers = 1):
+        job = load_job(label_dir)
+        if job is None:
+            raise ValueError(f"No unfinished auto label job in {label_dir}")
+        return self.run(
+            image_dir = job["image_dir"],
+            model_path = job["model_path"],
+            label_dir = label_dir,
+            conf = job["conf"],
+            batch_size = job.get("batch_size"),
+            incremental = True,
+            workers = workers,
+            tile_size = job.get("tile_size"),
+            tile_overlap = job.get("tile_overlap", TILE_OVERLAP)
+        )
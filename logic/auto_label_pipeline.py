@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from libs.atomic_io import atomic_write_text
+
+_DONE = object()
+
+
+def decode_image(image_path):
+    # cv2.imread không mở được đường dẫn có ký tự non-ASCII trên Windows
+    try:
+        data = np.fromfile(image_path, dtype=np.uint8)
+    except OSError:
+        data = None
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data is not None and data.size else None
+    if image is None:
+        raise ValueError(f"Cannot read image: {image_path}")
+    return image
+
+
+def result_size(result):
+    # orig_shape = (h, w) của ảnh gốc, không cần mở lại file
+    h, w = result.orig_shape[:2]
+    return w, h
+
+
+def result_rows(result):
+    # (cls, x, y, w, h) theo pixel, tách khỏi tensor để thread ghi file dùng
+    boxes = result.boxes
+    return [
+        (int(cls_id), x, y, bw, bh)
+        for cls_id, (x, y, bw, bh) in zip(boxes.cls.tolist(), boxes.xywh.tolist())
+    ]
+
+
+def write_label(label_path, rows, w, h):
+    lines = [
+        f"{cls_id} "
+        f"{x/w:.6f} {y/h:.6f} "
+        f"{bw/w:.6f} {bh/h:.6f}\n"
+        for cls_id, x, y, bw, bh in rows
+    ]
+    # atomic: kill giữa chừng không để lại file label ghi dở
+    atomic_write_text(label_path, "".join(lines))
+
+
+class AutoLabelPipeline:
+    # decode (thread pool) -> infer (caller thread) -> write (thread pool)
+    def __init__(self, model, conf, batch_size, decode_workers=4, write_workers=2, queue_size=4, on_done=None, cancel_event=None, tiler=None):
+        self.model = model
+        self.conf = conf
+        self.batch_size = batch_size
+        self.decode_workers = decode_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        # gọi từ thread ghi sau khi file label đã ghi xong
+        self.on_done = on_done
+        # cancel: dừng giữa các batch, vẫn ghi xong những ảnh đã infer
+        self.cancel_event = cancel_event
+        # TiledPredictor: ảnh lớn chạy theo tile thay vì cả frame
+        self.tiler = tiler
+
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size * batch_size)
+        self.stop_event = threading.Event()
+        self.error = None
+        self.lock = threading.Lock()
+        self.stats = {
+            "decode": 0.0,
+            "infer": 0.0,
+            "write": 0.0,
+            "images": 0,
+            "batches": 0,
+            "wall": 0.0,
+        }
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stats[stage] += seconds
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stop_event.set()
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def put(self, q, item, cancellable=False):
+        while not self.stop_event.is_set():
+            if cancellable and self.cancelled():
+                return False
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q, cancellable=False):
+        while not self.stop_event.is_set():
+            if cancellable and self.cancelled():
+                return _DONE
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def timed_decode(self, image_path):
+        start = time.perf_counter()
+        image = decode_image(image_path)
+        self.add_time("decode", time.perf_counter() - start)
+        return image
+
+    # stage 1
+    def decode_loop(self, jobs):
+        try:
+            with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+                for start in range(0, len(jobs), self.batch_size):
+                    if self.stop_event.is_set() or self.cancelled():
+                        return
+                    batch = jobs[start:start + self.batch_size]
+                    images = list(pool.map(self.timed_decode, [job[0] for job in batch]))
+                    if not self.put(self.decode_queue, (batch, images), cancellable=True):
+                        return
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(self.decode_queue, _DONE, cancellable=True)
+
+    # stage 3
+    def write_loop(self):
+        while True:
+            item = self.get(self.write_queue)
+            if item is _DONE:
+                return
+            image_path, label_path, rows, w, h = item
+            try:
+                start = time.perf_counter()
+                write_label(label_path, rows, w, h)
+                self.add_time("write", time.perf_counter() - start)
+                if self.on_done is not None:
+                    self.on_done(image_path, label_path)
+                with self.lock:
+                    self.stats["images"] += 1
+            except Exception as e:
+                self.fail(e)
+                return
+
+    # jobs: list (image_path, label_path)
+    def run(self, jobs):
+        wall_start = time.perf_counter()
+        decoder = threading.Thread(target=self.decode_loop, args=(jobs,), daemon=True)
+        writers = [
+            threading.Thread(target=self.write_loop, daemon=True)
+            for _ in range(self.write_workers)
+        ]
+        decoder.start()
+        for t in writers:
+            t.start()
+
+        # stage 2
+        try:
+            while True:
+                item = self.get(self.decode_queue, cancellable=True)
+                if item is _DONE:
+                    break
+                batch, images = item
+                start = time.perf_counter()
+                if self.tiler is not None:
+                    rows = [
+                        (self.tiler.predict(image), (image.shape[1], image.shape[0]))
+                        for image in images
+                    ]
+                else:
+                    results = self.model(images, conf=self.conf, verbose=False)
+                    rows = [(result_rows(r), result_size(r)) for r in results]
+                self.add_time("infer", time.perf_counter() - start)
+                with self.lock:
+                    self.stats["batches"] += 1
+                for (image_path, label_path), (image_rows, (w, h)) in zip(batch, rows):
+                    if not self.put(self.write_queue, (image_path, label_path, image_rows, w, h)):
+                        break
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in writers:
+                self.put(self.write_queue, _DONE)
+            decoder.join()
+            for t in writers:
+                t.join()
+            self.stats["wall"] = time.perf_counter() - wall_start
+
+        if self.error is not None:
+            raise self.error
+        return self.stats["images"]
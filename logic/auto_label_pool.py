@@ -0,0 +1,139 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from logic.auto_label_pipeline import AutoLabelPipeline
+from logic.tiled_inference import TiledPredictor
+
+# state của từng process con
+_logic = None
+_progress = None
+_cancel = None
+
+
+def _init_worker(model_path, progress_queue, cancel_event, torch_threads):
+    global _logic, _progress, _cancel
+    from logic.auto_label_logic import AutoLabelLogic
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _logic = AutoLabelLogic()
+    _logic.load_model(model_path)
+    _progress = progress_queue
+    _cancel = cancel_event
+
+
+def _label_chunk(jobs, conf, batch_size, tile_size, tile_overlap):
+    tiler = None
+    if tile_size:
+        tiler = TiledPredictor(_logic.model, conf, tile_size=tile_size, overlap=tile_overlap)
+
+    def on_done(image_path, label_path):
+        _progress.put(image_path)
+
+    pipeline = AutoLabelPipeline(
+        _logic.model,
+        conf,
+        batch_size,
+        decode_workers=2,
+        write_workers=1,
+        queue_size=1,
+        on_done=on_done,
+        cancel_event=_cancel,
+        tiler=tiler
+    )
+    pipeline.run(jobs)
+    return pipeline.stats
+
+
+class AutoLabelPool:
+    # mỗi process giữ 1 model riêng, ảnh chia thành chunk = bội số batch_size
+    # nên các batch giống hệt khi chạy tuần tự
+    BATCHES_PER_CHUNK = 4
+
+    def __init__(self, model_path, conf, batch_size, workers, on_done=None, cancel_event=None, tile_size=None, tile_overlap=0.2):
+        self.model_path = model_path
+        self.conf = conf
+        self.batch_size = batch_size
+        self.workers = workers
+        self.on_done = on_done
+        self.cancel_event = cancel_event
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.stats = {
+            "decode": 0.0,
+            "infer": 0.0,
+            "write": 0.0,
+            "images": 0,
+            "batches": 0,
+            "wall": 0.0,
+        }
+
+    def drain(self, progress_queue):
+        while True:
+            try:
+                image_path = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            if self.on_done is not None:
+                self.on_done(image_path)
+
+    def merge_stats(self, stats):
+        for key in ("decode", "infer", "write", "images", "batches"):
+            self.stats[key] += stats[key]
+
+    def run(self, jobs):
+        wall_start = time.perf_counter()
+        chunk_size = self.batch_size * self.BATCHES_PER_CHUNK
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        # spawn: fork sau khi đã có thread (QThread, torch) không an toàn
+        ctx = mp.get_context("spawn")
+        with ctx.Manager() as manager:
+            progress_queue = manager.Queue()
+            shared_cancel = manager.Event()
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(self.model_path, progress_queue, shared_cancel, torch_threads)
+                ) as pool:
+                    pending = {
+                        pool.submit(
+                            _label_chunk,
+                            chunk,
+                            self.conf,
+                            self.batch_size,
+                            self.tile_size,
+                            self.tile_overlap
+                        )
+                        for chunk in chunks
+                    }
+                    try:
+                        while pending:
+                            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                            self.drain(progress_queue)
+                            if self.cancel_event is not None and self.cancel_event.is_set():
+                                # chunk chưa chạy thì bỏ, chunk đang chạy dừng sau batch hiện tại
+                                if not shared_cancel.is_set():
+                                    shared_cancel.set()
+                                    for future in pending:
+                                        future.cancel()
+                                pending = {f for f in pending if not f.cancelled()}
+                            for future in done:
+                                self.merge_stats(future.result())
+                    except BaseException:
+                        for future in pending:
+                            future.cancel()
+                        raise
+            finally:
+                # ảnh đã ghi xong trong các process vẫn được báo về
+                self.drain(progress_queue)
+        self.stats["wall"] = time.perf_counter() - wall_start
+        return self.stats["images"]
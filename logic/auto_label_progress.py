@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+class ProgressTracker:
+    # tính img/s, ETA (moving average) và latency từng stage
+    # update() chỉ trả về event khi đã qua interval -> giới hạn số signal
+    def __init__(self, total, interval=0.25, smoothing=0.2):
+        self.total = total
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        self.last_time = self.start
+        self.last_done = 0
+        self.rate = None
+
+    def update(self, done, stats, force=False):
+        now = time.monotonic()
+        with self.lock:
+            elapsed = now - self.last_time
+            if not force and elapsed < self.interval and done < self.total:
+                return None
+            if elapsed > 0 and done > self.last_done:
+                instant = (done - self.last_done) / elapsed
+                if self.rate is None:
+                    self.rate = instant
+                else:
+                    self.rate += self.smoothing * (instant - self.rate)
+            self.last_time = now
+            self.last_done = done
+            rate = self.rate or 0.0
+
+        images = stats.get("images", 0) or done
+        latency = {
+            stage: (stats.get(stage, 0.0) / images * 1000.0) if images else 0.0
+            for stage in ("decode", "infer", "write")
+        }
+        return {
+            "done": done,
+            "total": self.total,
+            "rate": rate,
+            "eta": (self.total - done) / rate if rate > 0 else None,
+            "elapsed": now - self.start,
+            "latency_ms": latency,
+        }
@@ -1,24 +1,63 @@
+import threading
 from PyQt5.QtCore import QThread, pyqtSignal
+from logic.auto_label_progress import ProgressTracker
 
 class AutoLabelWorker(QThread):
     finished_signal = pyqtSignal(int)
     error_signal = pyqtSignal(str)
+    # thời gian từng stage: decode / infer / write
+    stats_signal = pyqtSignal(dict)
+    # done, total, rate, eta, latency_ms (throttled)
+    progress_signal = pyqtSignal(dict)
+    # số ảnh đã xong khi bị cancel
+    cancelled_signal = pyqtSignal(int)
 
-    def __init__(self, logic, image_dir, model_path, label_dir):
+    def __init__(self, logic, image_dir, model_path, label_dir, conf = 0.7, batch_size = None, incremental = False, workers = 1, tile_size = None, tile_overlap = 0.2):
         super().__init__()
         self.logic = logic
         self.image_dir = image_dir
         self.model_path = model_path
         self.label_dir = label_dir
+        self.conf = conf
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self.workers = workers
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tracker = None
+        self.tracker_lock = threading.Lock()
+
+    def cancel(self):
+        self.logic.cancel()
+
+    # gọi từ thread ghi label, có thể nhiều thread cùng lúc
+    def on_progress(self, done, total, stats):
+        with self.tracker_lock:
+            if self.tracker is None or self.tracker.total != total:
+                self.tracker = ProgressTracker(total)
+        event = self.tracker.update(done, stats)
+        if event is not None:
+            self.progress_signal.emit(event)
     
     def run(self):
         try:
             total = self.logic.run(
                 image_dir = self.image_dir,
                 model_path = self.model_path,
-                label_dir = self.label_dir
+                label_dir = self.label_dir,
+                conf = self.conf,
+                batch_size = self.batch_size,
+                incremental = self.incremental,
+                workers = self.workers,
+                progress = self.on_progress,
+                tile_size = self.tile_size,
+                tile_overlap = self.tile_overlap
             )
-            self.finished_signal.emit(total)
+            self.stats_signal.emit(dict(self.logic.stats))
+            if self.logic.cancelled:
+                self.cancelled_signal.emit(total)
+            else:
+                self.finished_signal.emit(total)
         except Exception as e:
             self.error_signal.emit(str(e))
         
\ No newline at end of file
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from libs.atomic_io import atomic_write_text
+
+MANIFEST_NAME = ".autolabel_manifest.json"
+MANIFEST_LOG_NAME = ".autolabel_manifest.log"
+JOB_NAME = ".autolabel_job.json"
+
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    # sha1 nội dung file, cache theo (path, mtime, size)
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _hash_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _hash_lock:
+        _hash_cache[key] = digest
+    return digest
+
+
+def load_job(label_dir):
+    path = os.path.join(label_dir, JOB_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_job(label_dir, job):
+    atomic_write_text(os.path.join(label_dir, JOB_NAME), json.dumps(job))
+
+
+def clear_job(label_dir):
+    path = os.path.join(label_dir, JOB_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class LabelManifest:
+    # per image: mtime/size của ảnh + hash model + conf đã dùng để label.
+    # Checkpoint trong lúc chạy chỉ append entry mới vào file log (.log, JSONL),
+    # manifest đầy đủ chỉ ghi lại lúc kết thúc run; load() gộp log vào (resume)
+    def __init__(self, label_dir, checkpoint_every=200, checkpoint_seconds=30.0):
+        self.path = os.path.join(label_dir, MANIFEST_NAME)
+        self.log_path = os.path.join(label_dir, MANIFEST_LOG_NAME)
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        # (tên ảnh, entry) chưa ghi vào log
+        self.buffer = []
+        self.last_save = time.monotonic()
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.entries = data.get("images", {})
+            except (OSError, ValueError):
+                self.entries = {}
+        if not os.path.exists(self.log_path):
+            return
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        name, entry = json.loads(line)
+                    except ValueError:
+                        # dòng cuối ghi dở
+                        break
+                    self.entries[name] = entry
+        except OSError:
+            pass
+
+    def checkpoint(self):
+        with self.save_lock:
+            with self.lock:
+                items = self.buffer
+                self.buffer = []
+                self.last_save = time.monotonic()
+            if not items:
+                return
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps([name, entry]) + "\n" for name, entry in items))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def save(self):
+        # cuối run: ghi manifest đầy đủ rồi bỏ log (đã nằm trong manifest)
+        with self.save_lock:
+            with self.lock:
+                text = json.dumps({"version": 1, "images": self.entries})
+                self.buffer = []
+                self.last_save = time.monotonic()
+            atomic_write_text(self.path, text)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+    @staticmethod
+    def make_entry(image_path, model_hash, conf):
+        st = os.stat(image_path)
+        return {
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+            "model": model_hash,
+            "conf": conf,
+        }
+
+    def is_up_to_date(self, image_path, label_path, model_hash, conf):
+        entry = self.entries.get(os.path.basename(image_path))
+        if not entry or not os.path.exists(label_path):
+            return False
+        try:
+            return entry == self.make_entry(image_path, model_hash, conf)
+        except OSError:
+            return False
+
+    def mark_done(self, image_path, model_hash, conf):
+        name = os.path.basename(image_path)
+        entry = self.make_entry(image_path, model_hash, conf)
+        with self.lock:
+            self.entries[name] = entry
+            self.buffer.append((name, entry))
+            due = (
+                len(self.buffer) >= self.checkpoint_every
+                or time.monotonic() - self.last_save >= self.checkpoint_seconds
+            )
+        if due:
+            self.checkpoint()
@@ -0,0 +1,59 @@
+import os
+import threading
+from collections import OrderedDict
+
+from logic.label_manifest import file_hash
+
+
+def model_size(model, model_path):
+    # bytes của weights đã load, fallback về dung lượng file .pt
+    try:
+        return sum(p.numel() * p.element_size() for p in model.model.parameters())
+    except (AttributeError, TypeError):
+        return os.path.getsize(model_path)
+
+
+class ModelCache:
+    # LRU theo (đường dẫn thật, hash file): đổi model là load đúng model,
+    # file .pt bị ghi đè thì hash khác -> load lại
+    def __init__(self, loader, max_models=4, max_bytes=2 * 1024 ** 3):
+        self.loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(model_path):
+        path = os.path.realpath(model_path)
+        return path, file_hash(path)
+
+    def total_bytes(self):
+        return sum(size for _, size in self.models.values())
+
+    def get(self, model_path):
+        key = self.key(model_path)
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key][0]
+
+        model = self.loader(model_path)
+        size = model_size(model, model_path)
+        with self.lock:
+            self.models[key] = (model, size)
+            self.models.move_to_end(key)
+            self.evict()
+        return model
+
+    def evict(self):
+        # luôn giữ lại model vừa dùng
+        while len(self.models) > 1 and (
+            len(self.models) > self.max_models
+            or self.total_bytes() > self.max_bytes
+        ):
+            self.models.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
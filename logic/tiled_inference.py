@@ -0,0 +1,116 @@
+import numpy as np
+
+# box cách mép trong của tile <= EDGE_MARGIN px coi như bị tile cắt
+EDGE_MARGIN = 2
+
+
+def tile_starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    # tile cuối sát mép ảnh
+    starts.append(length - tile)
+    return starts
+
+
+def iter_tiles(w, h, tile, overlap):
+    stride = max(1, int(tile * (1.0 - overlap)))
+    for y in tile_starts(h, tile, stride):
+        for x in tile_starts(w, tile, stride):
+            yield x, y, min(tile, w - x), min(tile, h - y)
+
+
+def nms(boxes, scores, iou_threshold, edge=None):
+    # boxes: (N, 4) xyxy, trả về index giữ lại theo score giảm dần.
+    # edge: box bị cắt ở mép trong của tile -> so bằng intersection / box nhỏ hơn
+    # (IoU với box đầy đủ ở tile bên cạnh thấp) và xét sau các box nguyên vẹn
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(min=0) * (y2 - y1).clip(min=0)
+    if edge is None:
+        edge = np.zeros(len(boxes), dtype=bool)
+    order = np.lexsort((-scores, edge))
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        inter = (xx2 - xx1).clip(min=0) * (yy2 - yy1).clip(min=0)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        ios = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        overlap = np.where(edge[i] | edge[rest], ios, iou)
+        order = rest[overlap <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class TiledPredictor:
+    # cắt ảnh lớn thành tile chồng lấn, chạy model theo batch tile,
+    # gộp box bằng NMS giữa các tile. Tile là view của ảnh gốc (không copy),
+    # mỗi lần chỉ giữ tối đa tile_batch tile.
+    def __init__(self, model, conf, tile_size=1024, overlap=0.2, tile_batch=8, iou=0.5):
+        self.model = model
+        self.conf = conf
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.tile_batch = tile_batch
+        self.iou = iou
+
+    @staticmethod
+    def edge_mask(xyxy, tile, w, h):
+        # mép tile trùng mép ảnh không tính (box thật sự chạm mép ảnh)
+        x, y, tw, th = tile
+        edge = np.zeros(len(xyxy), dtype=bool)
+        if x > 0:
+            edge |= xyxy[:, 0] <= EDGE_MARGIN
+        if y > 0:
+            edge |= xyxy[:, 1] <= EDGE_MARGIN
+        if x + tw < w:
+            edge |= xyxy[:, 2] >= tw - EDGE_MARGIN
+        if y + th < h:
+            edge |= xyxy[:, 3] >= th - EDGE_MARGIN
+        return edge
+
+    def run_tiles(self, tiles, crops, size, boxes, scores, classes, edges):
+        results = self.model(crops, conf=self.conf, verbose=False)
+        for tile, r in zip(tiles, results):
+            if not len(r.boxes):
+                continue
+            x, y = tile[:2]
+            xyxy = r.boxes.xyxy.cpu().numpy().astype(np.float32)
+            edges.append(self.edge_mask(xyxy, tile, *size))
+            xyxy += np.array([x, y, x, y], dtype=np.float32)
+            boxes.append(xyxy)
+            scores.append(r.boxes.conf.cpu().numpy())
+            classes.append(r.boxes.cls.cpu().numpy().astype(np.int64))
+
+    def predict(self, image):
+        h, w = image.shape[:2]
+        boxes, scores, classes, edges = [], [], [], []
+        tiles, crops = [], []
+        for x, y, tw, th in iter_tiles(w, h, self.tile_size, self.overlap):
+            tiles.append((x, y, tw, th))
+            crops.append(image[y:y + th, x:x + tw])
+            if len(crops) >= self.tile_batch:
+                self.run_tiles(tiles, crops, (w, h), boxes, scores, classes, edges)
+                tiles, crops = [], []
+        if crops:
+            self.run_tiles(tiles, crops, (w, h), boxes, scores, classes, edges)
+        if not boxes:
+            return []
+
+        boxes = np.concatenate(boxes)
+        scores = np.concatenate(scores)
+        classes = np.concatenate(classes)
+        edges = np.concatenate(edges)
+        # NMS theo từng class: dịch box mỗi class ra vùng riêng
+        shift = (classes * (max(w, h) + 1)).astype(np.float32)[:, None]
+        keep = nms(boxes + shift, scores, self.iou, edges)
+
+        rows = []
+        for i in keep:
+            x1, y1, x2, y2 = boxes[i].tolist()
+            rows.append((int(classes[i]), (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1))
+        return rows
@@ -0,0 +1,38 @@
+import os
+import sys
+
+# chạy pytest từ bất kỳ đâu: import theo gốc repo (libs, logic, widgets...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Rect:
+    # thay QRect/QRectF cho test không cần PyQt5
+    def __init__(self, x, y, w, h):
+        self.v = (x, y, w, h)
+
+    def x(self):
+        return self.v[0]
+
+    def y(self):
+        return self.v[1]
+
+    def width(self):
+        return self.v[2]
+
+    def height(self):
+        return self.v[3]
+
+    def __eq__(self, other):
+        return isinstance(other, Rect) and self.v == other.v
+
+    def left(self):
+        return self.v[0]
+
+    def top(self):
+        return self.v[1]
+
+    def right(self):
+        return self.v[0] + self.v[2]
+
+    def bottom(self):
+        return self.v[1] + self.v[3]
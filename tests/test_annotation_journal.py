@@ -0,0 +1,157 @@
+import os
+
+from conftest import Rect
+from libs.annotation_journal import AnnotationJournal, parse_yolo, format_yolo
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def crash(journal):
+    # process chết: file đóng, khóa nhả, journal còn nguyên trên đĩa
+    journal.file.close()
+    journal.file = None
+
+
+def make(tmp_path):
+    journal = AnnotationJournal(str(tmp_path / "journal"))
+    journal.start()
+    return journal
+
+
+def create(index, label, rect):
+    return {"op": "create", "index": index, "box": {"label": label, "label_name": "", "rect": rect}}
+
+
+def test_yolo_roundtrip():
+    text = "0 0.500000 0.500000 0.200000 0.400000\n3 0.100000 0.200000 0.050000 0.050000\n"
+    assert format_yolo(parse_yolo(text, 640, 480), 640, 480) == text
+
+
+def test_recover_replays_edits_onto_label_file(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "0 0.500000 0.500000 0.200000 0.200000\n")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(1, 1, Rect(10, 10, 20, 20)))
+    rect = {"op": "rect", "index": 0, "old": Rect(40, 40, 20, 20), "new": Rect(0, 0, 20, 20)}
+    journal.record("edit", rect)
+    journal.record("undo", rect)
+    crash(journal)
+
+    pending = AnnotationJournal(str(tmp_path / "journal")).recover()
+    assert pending == {
+        label: "0 0.500000 0.500000 0.200000 0.200000\n1 0.200000 0.200000 0.200000 0.200000\n"
+    }
+
+
+def test_recover_skips_live_journal(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+
+    other = AnnotationJournal(str(tmp_path / "journal"))
+    assert other.recover() == {}
+    other.finish_recovery()
+    assert os.path.exists(journal.path)
+
+
+def test_saved_but_unwritten_text_is_recovered(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    journal.saved(label, "1 0.2 0.2 0.2 0.2\n")
+    crash(journal)
+
+    assert AnnotationJournal(str(tmp_path / "journal")).recover() == {label: "1 0.2 0.2 0.2 0.2\n"}
+
+
+def test_saved_and_written_needs_nothing(tmp_path):
+    label = str(tmp_path / "a.txt")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    journal.saved(label, "1 0.2 0.2 0.2 0.2\n")
+    write(label, "1 0.2 0.2 0.2 0.2\n")
+    crash(journal)
+
+    assert AnnotationJournal(str(tmp_path / "journal")).recover() == {}
+
+
+def test_discard_drops_edits(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    journal.discard(label)
+    crash(journal)
+
+    assert AnnotationJournal(str(tmp_path / "journal")).recover() == {}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    journal.file.write('{"a": "edit", "cmd": {"op"')
+    crash(journal)
+
+    pending = AnnotationJournal(str(tmp_path / "journal")).recover()
+    assert pending == {label: "1 0.200000 0.200000 0.200000 0.200000\n"}
+
+
+def test_compact_waits_for_dirty_and_unwritten(tmp_path):
+    label = str(tmp_path / "a.txt")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    journal.compact()
+    assert os.path.getsize(journal.path) > 0
+
+    journal.saved(label, "x\n")
+    journal.compact()
+    assert os.path.getsize(journal.path) > 0
+
+    journal.write_failed(label)
+    journal.compact()
+    assert os.path.getsize(journal.path) > 0
+
+    journal.saved(label, "x\n")
+    journal.written(label)
+    journal.compact()
+    assert os.path.getsize(journal.path) == 0
+
+
+def test_clean_close_removes_journal(tmp_path):
+    journal = make(tmp_path)
+    path = journal.path
+    journal.close()
+    assert not os.path.exists(path)
+
+
+def test_finish_recovery_removes_orphans(tmp_path):
+    label = str(tmp_path / "a.txt")
+    write(label, "")
+    journal = make(tmp_path)
+    journal.open(label, 100, 100)
+    journal.record("edit", create(0, 1, Rect(10, 10, 20, 20)))
+    crash(journal)
+
+    other = AnnotationJournal(str(tmp_path / "journal"))
+    assert other.recover()
+    other.finish_recovery()
+    assert not os.path.exists(journal.path)
@@ -0,0 +1,33 @@
+import os
+import stat
+
+import pytest
+
+from libs.atomic_io import atomic_write_text
+
+
+def test_writes_content(tmp_path):
+    path = str(tmp_path / "a.txt")
+    atomic_write_text(path, "hello\n")
+    with open(path) as f:
+        assert f.read() == "hello\n"
+    assert os.listdir(tmp_path) == ["a.txt"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_new_file_mode_matches_plain_open(tmp_path):
+    plain = str(tmp_path / "plain.txt")
+    with open(plain, "w") as f:
+        f.write("x")
+    path = str(tmp_path / "a.txt")
+    atomic_write_text(path, "x")
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(plain).st_mode)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_existing_file_mode_is_kept(tmp_path):
+    path = str(tmp_path / "a.txt")
+    atomic_write_text(path, "x")
+    os.chmod(path, 0o664)
+    atomic_write_text(path, "y")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o664
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from logic.auto_label_pipeline import AutoLabelPipeline, decode_image
+
+
+class Values:
+    def __init__(self, values):
+        self.values = values
+
+    def tolist(self):
+        return self.values
+
+
+class Boxes:
+    def __init__(self, w, h):
+        self.cls = Values([1])
+        self.xywh = Values([[w / 2, h / 2, w / 4, h / 4]])
+
+
+class Result:
+    def __init__(self, image):
+        h, w = image.shape[:2]
+        self.orig_shape = (h, w)
+        self.boxes = Boxes(w, h)
+
+
+class StubModel:
+    # mỗi ảnh 1 box class 1 ở giữa ảnh; raise_on/on_call để thử lỗi và cancel
+    def __init__(self, raise_on=None, on_call=None):
+        self.calls = 0
+        self.raise_on = raise_on
+        self.on_call = on_call
+
+    def __call__(self, images, conf, verbose):
+        self.calls += 1
+        if self.raise_on == self.calls:
+            raise RuntimeError("inference failed")
+        if self.on_call is not None:
+            self.on_call(self.calls)
+        return [Result(image) for image in images]
+
+
+def write_image(path, w=40, h=20):
+    ok, data = cv2.imencode(".png", np.zeros((h, w, 3), dtype=np.uint8))
+    assert ok
+    data.tofile(str(path))
+    return str(path)
+
+
+def make_jobs(tmp_path, count):
+    return [
+        (write_image(tmp_path / f"{i}.png"), str(tmp_path / f"{i}.txt"))
+        for i in range(count)
+    ]
+
+
+def test_decode_non_ascii_path(tmp_path):
+    path = write_image(tmp_path / "ảnh_lỗi.png")
+    assert decode_image(path).shape == (20, 40, 3)
+    with pytest.raises(ValueError):
+        decode_image(str(tmp_path / "missing.png"))
+
+
+def test_run_writes_labels(tmp_path):
+    jobs = make_jobs(tmp_path, 5)
+    done = []
+    pipeline = AutoLabelPipeline(
+        StubModel(), 0.5, batch_size=2,
+        on_done=lambda image_path, label_path: done.append(label_path),
+    )
+    assert pipeline.run(jobs) == 5
+    assert sorted(done) == sorted(label for _, label in jobs)
+    with open(jobs[0][1]) as f:
+        assert f.read() == "1 0.500000 0.500000 0.250000 0.250000\n"
+    assert pipeline.stats["batches"] == 3
+
+
+def test_cancel_stops_after_current_batch(tmp_path):
+    jobs = make_jobs(tmp_path, 10)
+    cancel = threading.Event()
+
+    def on_call(calls):
+        if calls == 2:
+            cancel.set()
+
+    pipeline = AutoLabelPipeline(StubModel(on_call=on_call), 0.5, batch_size=1, cancel_event=cancel)
+    # batch đã infer vẫn được ghi xong
+    assert pipeline.run(jobs) == 2
+
+
+def test_infer_error_is_raised(tmp_path):
+    pipeline = AutoLabelPipeline(StubModel(raise_on=2), 0.5, batch_size=1)
+    with pytest.raises(RuntimeError):
+        pipeline.run(make_jobs(tmp_path, 4))
+
+
+def test_decode_error_is_raised(tmp_path):
+    jobs = make_jobs(tmp_path, 2)
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not an image")
+    jobs.append((str(bad), str(tmp_path / "bad.txt")))
+    pipeline = AutoLabelPipeline(StubModel(), 0.5, batch_size=1)
+    with pytest.raises(ValueError):
+        pipeline.run(jobs)
+
+
+def test_write_error_is_raised(tmp_path):
+    image = write_image(tmp_path / "a.png")
+    pipeline = AutoLabelPipeline(StubModel(), 0.5, batch_size=1)
+    with pytest.raises(OSError):
+        pipeline.run([(image, str(tmp_path / "missing" / "a.txt"))])
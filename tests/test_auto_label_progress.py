@@ -0,0 +1,54 @@
+from logic import auto_label_progress
+from logic.auto_label_progress import ProgressTracker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def tracker(monkeypatch, total, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(auto_label_progress.time, "monotonic", clock)
+    return ProgressTracker(total, **kwargs), clock
+
+
+def test_update_throttled_by_interval(monkeypatch):
+    progress, clock = tracker(monkeypatch, 100, interval=1.0)
+    clock.now += 0.5
+    assert progress.update(5, {}) is None
+    assert progress.update(5, {}, force=True) is not None
+    clock.now += 0.1
+    # xong hết luôn báo, không chờ interval
+    assert progress.update(100, {}) is not None
+
+
+def test_rate_eta_and_smoothing(monkeypatch):
+    progress, clock = tracker(monkeypatch, 100, interval=1.0, smoothing=0.5)
+    clock.now += 1.0
+    info = progress.update(10, {})
+    assert info["rate"] == 10.0
+    assert info["eta"] == 9.0
+    assert info["elapsed"] == 1.0
+    clock.now += 1.0
+    info = progress.update(40, {})
+    # moving average: 10 + 0.5 * (30 - 10)
+    assert info["rate"] == 20.0
+    assert info["eta"] == 3.0
+
+
+def test_no_rate_yet_has_no_eta(monkeypatch):
+    progress, clock = tracker(monkeypatch, 10)
+    info = progress.update(0, {}, force=True)
+    assert info["rate"] == 0.0
+    assert info["eta"] is None
+
+
+def test_stage_latency_per_image(monkeypatch):
+    progress, clock = tracker(monkeypatch, 10)
+    clock.now += 1.0
+    info = progress.update(4, {"images": 4, "decode": 0.2, "infer": 0.4})
+    assert info["latency_ms"] == {"decode": 50.0, "infer": 100.0, "write": 0.0}
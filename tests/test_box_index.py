@@ -0,0 +1,56 @@
+from conftest import Rect
+from widgets.box_index import BoxGridIndex
+
+
+def box(x, y, w=10, h=10):
+    return {"label": 0, "rect": Rect(x, y, w, h)}
+
+
+def test_query_point_finds_only_nearby_boxes():
+    index = BoxGridIndex(cell_size=100)
+    boxes = [box(5, 5), box(500, 500), box(150, 20)]
+    index.sync(boxes)
+    assert index.query_point(8, 8) == {0}
+    assert index.query_point(505, 505) == {1}
+    assert index.query_point(300, 300) == set()
+
+
+def test_query_region_and_big_boxes():
+    index = BoxGridIndex(cell_size=10)
+    boxes = [box(0, 0), box(100, 100), box(0, 0, 1000, 1000)]
+    index.sync(boxes)
+    # box phủ quá nhiều cell luôn được trả về
+    assert 2 in index.big
+    assert index.query(90, 90, 120, 120) == {1, 2}
+    assert index.query(-1e6, -1e6, 1e6, 1e6) == {0, 1, 2}
+
+
+def test_update_moves_box():
+    index = BoxGridIndex(cell_size=100)
+    boxes = [box(5, 5)]
+    index.sync(boxes)
+    boxes[0]["rect"] = Rect(405, 405, 10, 10)
+    index.update(0, boxes[0]["rect"])
+    assert index.query_point(8, 8) == set()
+    assert index.query_point(408, 408) == {0}
+
+
+def test_sync_rebuilds_after_invalidate():
+    index = BoxGridIndex(cell_size=100)
+    boxes = [box(5, 5), box(305, 5)]
+    index.sync(boxes)
+    # xóa 1 box rồi thêm 1 box: cùng list, cùng độ dài -> cần invalidate
+    del boxes[0]
+    boxes.append(box(605, 5))
+    index.invalidate()
+    index.sync(boxes)
+    assert index.query_point(308, 8) == {0}
+    assert index.query_point(608, 8) == {1}
+    assert index.query_point(8, 8) == set()
+
+
+def test_sync_rebuilds_when_list_replaced():
+    index = BoxGridIndex(cell_size=100)
+    index.sync([box(5, 5)])
+    index.sync([box(305, 5)])
+    assert index.query_point(308, 8) == {0}
@@ -0,0 +1,82 @@
+from widgets.edit_history import (
+    EditHistory, apply_cmd, create_cmd, delete_cmd, label_cmd, rect_cmd, replace_cmd,
+)
+
+
+def box(label, rect="r"):
+    return {"label": label, "label_name": str(label), "rect": rect}
+
+
+def test_apply_create_delete_roundtrip():
+    boxes = [box(0), box(1)]
+    cmd = create_cmd(1, box(2))
+    apply_cmd(boxes, cmd)
+    assert [b["label"] for b in boxes] == [0, 2, 1]
+    apply_cmd(boxes, cmd, reverse=True)
+    assert [b["label"] for b in boxes] == [0, 1]
+
+    cmd = delete_cmd(0, boxes[0])
+    apply_cmd(boxes, cmd)
+    assert [b["label"] for b in boxes] == [1]
+    apply_cmd(boxes, cmd, reverse=True)
+    assert [b["label"] for b in boxes] == [0, 1]
+
+
+def test_apply_rect_label_replace():
+    boxes = [box(0, "a")]
+    apply_cmd(boxes, rect_cmd(0, "a", "b"))
+    assert boxes[0]["rect"] == "b"
+    apply_cmd(boxes, rect_cmd(0, "a", "b"), reverse=True)
+    assert boxes[0]["rect"] == "a"
+
+    apply_cmd(boxes, label_cmd(0, 0, "0", 3, "C"))
+    assert (boxes[0]["label"], boxes[0]["label_name"]) == (3, "C")
+    apply_cmd(boxes, label_cmd(0, 0, "0", 3, "C"), reverse=True)
+    assert (boxes[0]["label"], boxes[0]["label_name"]) == (0, "0")
+
+    cmd = replace_cmd(boxes, [box(5), box(6)])
+    apply_cmd(boxes, cmd)
+    assert [b["label"] for b in boxes] == [5, 6]
+    apply_cmd(boxes, cmd, reverse=True)
+    assert [b["label"] for b in boxes] == [0]
+
+
+def test_create_cmd_copies_box():
+    b = box(0)
+    cmd = create_cmd(0, b)
+    b["label"] = 9
+    assert cmd["box"]["label"] == 0
+
+
+def test_history_undo_redo_and_listener():
+    events = []
+    history = EditHistory()
+    history.listener = lambda action, cmd: events.append((action, cmd["op"]))
+    boxes = []
+    b = box(1)
+    boxes.append(b)
+    history.push(create_cmd(0, b))
+
+    assert history.undo(boxes)["op"] == "create"
+    assert boxes == []
+    assert history.undo(boxes) is None
+    assert history.redo(boxes)["op"] == "create"
+    assert [x["label"] for x in boxes] == [1]
+    assert events == [("edit", "create"), ("undo", "create"), ("redo", "create")]
+
+
+def test_push_clears_redo():
+    history = EditHistory()
+    boxes = [box(0)]
+    history.push(rect_cmd(0, "a", "b"))
+    history.undo(boxes)
+    assert history.can_redo()
+    history.push(rect_cmd(0, "a", "c"))
+    assert not history.can_redo()
+
+
+def test_history_limit():
+    history = EditHistory(limit=3)
+    for i in range(5):
+        history.push(rect_cmd(0, i, i + 1))
+    assert len(history.undo_stack) == 3
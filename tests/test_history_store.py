@@ -0,0 +1,82 @@
+from widgets.edit_history import CMD_BYTES, HistoryStore, rect_cmd, replace_cmd
+
+
+def box(label, rect="r"):
+    return {"label": label, "label_name": str(label), "rect": rect}
+
+
+def test_store_keeps_history_only_after_push():
+    store = HistoryStore()
+    a = store.get("a.jpg")
+    assert not store.histories
+    # chưa sửa gì -> mỗi lần get là history mới, không tốn chỗ
+    assert store.get("a.jpg") is not a
+    a.push(rect_cmd(0, "x", "y"))
+    assert store.get("a.jpg") is a
+    assert store.get("b.jpg") is not a
+    assert list(store.histories) == ["a.jpg"]
+
+
+def test_store_running_total_matches_histories():
+    store = HistoryStore(limit=2)
+    history = store.get("a")
+    for _ in range(3):
+        history.push(rect_cmd(0, "x", "y"))
+    # deque giới hạn 2 -> command cũ nhất bị bỏ, bytes trừ theo
+    assert history.memory() == 2 * CMD_BYTES
+    boxes = [box(0)]
+    history.undo(boxes)
+    assert history.memory() == 2 * CMD_BYTES
+    history.push(rect_cmd(0, "y", "z"))
+    assert history.memory() == 2 * CMD_BYTES
+    assert store.total == history.memory() + store.OVERHEAD
+
+
+def test_store_evicts_least_recent_over_budget():
+    store = HistoryStore(max_bytes=2 * (3 * CMD_BYTES + HistoryStore.OVERHEAD))
+    for key in ("a", "b", "c"):
+        history = store.get(key)
+        for _ in range(3):
+            history.push(rect_cmd(0, "x", "y"))
+    # evict ngay khi push, giữ 2 history sửa gần nhất
+    assert list(store.histories) == ["b", "c"]
+    assert store.total == 2 * (3 * CMD_BYTES + store.OVERHEAD)
+
+
+def test_store_overhead_counts_toward_budget():
+    store = HistoryStore(max_bytes=10 * HistoryStore.OVERHEAD)
+    for i in range(100):
+        store.get(str(i)).push(rect_cmd(0, "x", "y"))
+    assert store.total <= store.max_bytes
+    assert len(store.histories) < 10
+
+
+def test_store_keeps_current_even_if_over_budget():
+    store = HistoryStore(max_bytes=1)
+    history = store.get("a")
+    history.push(replace_cmd([box(0)] * 10, []))
+    assert store.get("a") is history
+
+
+def test_store_drops_emptied_histories():
+    store = HistoryStore()
+    a = store.get("a")
+    a.push(rect_cmd(0, "x", "y"))
+    b = store.get("b")
+    b.push(rect_cmd(0, "x", "y"))
+    store.clear()
+    assert not store.histories
+    assert store.total == 0
+    assert not a.can_undo()
+    # object cũ vẫn dùng được: sửa tiếp -> vào lại store
+    a.push(rect_cmd(0, "x", "y"))
+    assert store.get("a") is a
+
+
+def test_store_discard():
+    store = HistoryStore()
+    store.get("a").push(rect_cmd(0, "x", "y"))
+    store.discard("a")
+    store.discard("missing")
+    assert not store.histories
+    assert store.total == 0
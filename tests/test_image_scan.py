@@ -0,0 +1,71 @@
+import os
+
+from libs import image_scan
+from libs.image_scan import DirectoryIndex, scan_images
+
+
+def touch(path, age=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+    if age:
+        past = os.stat(path).st_mtime - age
+        os.utime(path, (past, past))
+
+
+def settle(folder, age=60):
+    # mtime cũ hơn MTIME_SETTLE_NS -> index mới tin cache
+    past = os.stat(folder).st_mtime - age
+    os.utime(folder, (past, past))
+
+
+def test_scan_images_filters_and_sorts(tmp_path):
+    for name in ("b.JPG", "a.png", "notes.txt", "c.jpeg"):
+        touch(str(tmp_path / name))
+    touch(str(tmp_path / "sub" / "d.bmp"))
+    names = [os.path.basename(p) for p in scan_images(str(tmp_path), use_index=False)]
+    assert names == ["a.png", "b.JPG", "c.jpeg"]
+    paths = scan_images(str(tmp_path), recursive=True, use_index=False)
+    assert str(tmp_path / "sub" / "d.bmp") in paths
+    assert scan_images(str(tmp_path / "missing")) == []
+
+
+def test_index_reuses_settled_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "images"
+    touch(str(folder / "a.jpg"))
+    settle(str(folder))
+    index_dir = str(tmp_path / "index")
+    index = DirectoryIndex(str(folder), index_dir=index_dir)
+    assert index.scan() == [str(folder / "a.jpg")]
+    index.save()
+
+    def fail(folder):
+        raise AssertionError("folder should come from the index")
+
+    monkeypatch.setattr(image_scan, "scan_dir", fail)
+    cached = DirectoryIndex(str(folder), index_dir=index_dir)
+    cached.load()
+    assert cached.scan() == [str(folder / "a.jpg")]
+    assert not cached.changed
+
+
+def test_index_rescans_changed_and_recent_folders(tmp_path):
+    folder = tmp_path / "images"
+    touch(str(folder / "a.jpg"))
+    index_dir = str(tmp_path / "index")
+    index = DirectoryIndex(str(folder), index_dir=index_dir)
+    index.scan()
+    # mtime còn mới -> chưa lưu mtime, lần sau vẫn scandir lại
+    assert index.dirs[""]["mtime"] is None
+    touch(str(folder / "b.jpg"))
+    assert sorted(index.scan()) == [str(folder / "a.jpg"), str(folder / "b.jpg")]
+
+
+def test_index_drops_removed_subdirs(tmp_path):
+    touch(str(tmp_path / "sub" / "a.jpg"))
+    index = DirectoryIndex(str(tmp_path), recursive=True, index_dir=str(tmp_path / "index"))
+    index.scan()
+    assert "sub" in index.dirs
+    os.remove(str(tmp_path / "sub" / "a.jpg"))
+    os.rmdir(str(tmp_path / "sub"))
+    assert index.scan() == []
+    assert "sub" not in index.dirs
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from libs.label_index import LabelIndex, parse_text
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_parse_text_rows():
+    rows = parse_text("0 0.5 0.5 0.1 0.1\n2 0.2 0.3 0.4 0.5\n")
+    assert rows.shape == (2, 5)
+    assert rows[1].tolist() == pytest.approx([2, 0.2, 0.3, 0.4, 0.5])
+
+
+def test_parse_text_skips_wrong_column_count():
+    # 5 dòng x 6 cột = 30 token, chia hết cho 5 nhưng không phải YOLO 5 cột
+    text = "".join("0 0.5 0.5 0.1 0.1 0.9\n" for _ in range(5))
+    assert parse_text(text).shape == (0, 5)
+    assert parse_text(text + "1 0.5 0.5 0.1 0.1\n").shape == (1, 5)
+
+
+def test_parse_text_skips_non_numeric():
+    rows = parse_text("a 0.5 0.5 0.1 0.1\n1 0.5 0.5 0.1 0.1\n")
+    assert rows[:, 0].tolist() == [1]
+
+
+def test_refresh_incremental(tmp_path):
+    labels = tmp_path / "labels"
+    labels.mkdir()
+    write(labels / "a.txt", "0 0.5 0.5 0.1 0.1\n1 0.5 0.5 0.1 0.1\n")
+    write(labels / "b.txt", "1 0.5 0.5 0.1 0.1\n")
+    write(labels / "c.txt", "")
+    write(labels / "classes.txt", "A\nB\n")
+    index_dir = str(tmp_path / "index")
+
+    index = LabelIndex(str(labels), index_dir=index_dir)
+    assert index.refresh() == 3
+    assert index.class_counts(3).tolist() == [1, 2, 0]
+    assert sorted(index.images_with_class(1)) == ["a.txt", "b.txt"]
+    assert index.unlabeled(["/x/a.jpg", "/x/c.jpg", "/x/d.jpg"]) == ["/x/c.jpg", "/x/d.jpg"]
+
+    # mở lại: dùng mmap đã lưu, không parse lại
+    again = LabelIndex(str(labels), index_dir=index_dir)
+    assert again.refresh() == 0
+    assert again.box_count() == 3
+
+    os.remove(labels / "a.txt")
+    write(labels / "b.txt", "0 0.5 0.5 0.1 0.1\n0 0.5 0.5 0.1 0.1\n")
+    os.utime(labels / "b.txt", ns=(1, 1))
+    assert again.refresh() == 1
+    assert again.class_counts(2).tolist() == [2, 0]
+    assert again.images_with_class(0) == ["b.txt"]
@@ -0,0 +1,59 @@
+import os
+
+from logic.label_manifest import LabelManifest, MANIFEST_LOG_NAME, MANIFEST_NAME
+
+
+def touch(path, text="x"):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_up_to_date_after_mark_done(tmp_path):
+    image = str(tmp_path / "a.jpg")
+    label = str(tmp_path / "a.txt")
+    touch(image)
+    manifest = LabelManifest(str(tmp_path))
+    manifest.mark_done(image, "model", 0.5)
+
+    assert not manifest.is_up_to_date(image, label, "model", 0.5)
+    touch(label, "")
+    assert manifest.is_up_to_date(image, label, "model", 0.5)
+    assert not manifest.is_up_to_date(image, label, "other", 0.5)
+    assert not manifest.is_up_to_date(image, label, "model", 0.6)
+    touch(image, "changed")
+    assert not manifest.is_up_to_date(image, label, "model", 0.5)
+
+
+def test_checkpoint_appends_log_and_load_merges(tmp_path):
+    image = str(tmp_path / "a.jpg")
+    touch(image)
+    manifest = LabelManifest(str(tmp_path), checkpoint_every=1)
+    manifest.mark_done(image, "model", 0.5)
+
+    assert os.path.exists(tmp_path / MANIFEST_LOG_NAME)
+    assert not os.path.exists(tmp_path / MANIFEST_NAME)
+    resumed = LabelManifest(str(tmp_path))
+    assert "a.jpg" in resumed.entries
+
+
+def test_save_writes_manifest_and_drops_log(tmp_path):
+    image = str(tmp_path / "a.jpg")
+    touch(image)
+    manifest = LabelManifest(str(tmp_path), checkpoint_every=1)
+    manifest.mark_done(image, "model", 0.5)
+    manifest.save()
+
+    assert os.path.exists(tmp_path / MANIFEST_NAME)
+    assert not os.path.exists(tmp_path / MANIFEST_LOG_NAME)
+    assert "a.jpg" in LabelManifest(str(tmp_path)).entries
+
+
+def test_truncated_log_line_is_ignored(tmp_path):
+    image = str(tmp_path / "a.jpg")
+    touch(image)
+    manifest = LabelManifest(str(tmp_path), checkpoint_every=1)
+    manifest.mark_done(image, "model", 0.5)
+    with open(tmp_path / MANIFEST_LOG_NAME, "a") as f:
+        f.write('["b.jpg", {"mti')
+
+    assert list(LabelManifest(str(tmp_path)).entries) == ["a.jpg"]
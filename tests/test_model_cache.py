@@ -0,0 +1,83 @@
+from logic.model_cache import ModelCache
+
+
+class Param:
+    def __init__(self, n):
+        self.n = n
+
+    def numel(self):
+        return self.n
+
+    def element_size(self):
+        return 4
+
+
+class FakeModel:
+    def __init__(self, path, params=0):
+        self.path = path
+        if params:
+            self.model = self
+            self.params = [Param(params)]
+
+    def parameters(self):
+        return self.params
+
+
+class Loader:
+    def __init__(self, params=0):
+        self.params = params
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path)
+        return FakeModel(path, self.params)
+
+
+def weights(tmp_path, name, data=b"w"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_cache_loads_once_per_model(tmp_path):
+    loader = Loader()
+    cache = ModelCache(loader)
+    a = weights(tmp_path, "a.pt")
+    b = weights(tmp_path, "b.pt", b"other")
+    assert cache.get(a) is cache.get(a)
+    assert cache.get(b).path == b
+    assert loader.calls == [a, b]
+
+
+def test_cache_reloads_overwritten_file(tmp_path):
+    loader = Loader()
+    cache = ModelCache(loader)
+    a = weights(tmp_path, "a.pt", b"v1")
+    first = cache.get(a)
+    weights(tmp_path, "a.pt", b"version 2")
+    assert cache.get(a) is not first
+    assert len(loader.calls) == 2
+
+
+def test_cache_evicts_least_recent(tmp_path):
+    loader = Loader()
+    cache = ModelCache(loader, max_models=2)
+    paths = [weights(tmp_path, f"{i}.pt", bytes([i])) for i in range(3)]
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+    assert [key[0] for key in cache.models] == [
+        cache.key(paths[0])[0], cache.key(paths[2])[0]
+    ]
+
+
+def test_cache_byte_budget_keeps_latest(tmp_path):
+    # mỗi model 400 bytes weights, budget 500 -> chỉ giữ model vừa dùng
+    cache = ModelCache(Loader(params=100), max_bytes=500)
+    a = weights(tmp_path, "a.pt", b"a")
+    b = weights(tmp_path, "b.pt", b"b")
+    cache.get(a)
+    model = cache.get(b)
+    assert len(cache.models) == 1
+    assert cache.get(b) is model
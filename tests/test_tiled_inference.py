@@ -0,0 +1,42 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from logic.tiled_inference import iter_tiles, nms, tile_starts, TiledPredictor
+
+
+def test_tile_starts_cover_length():
+    assert tile_starts(500, 1024, 800) == [0]
+    starts = tile_starts(2500, 1024, 819)
+    assert starts[0] == 0
+    assert starts[-1] == 2500 - 1024
+    assert all(b - a <= 819 for a, b in zip(starts, starts[1:]))
+
+
+def test_iter_tiles_stay_inside_image():
+    for x, y, tw, th in iter_tiles(3000, 2000, 1024, 0.2):
+        assert 0 <= x and x + tw <= 3000
+        assert 0 <= y and y + th <= 2000
+
+
+def test_nms_suppresses_overlap_keeps_separate():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [0, 2]
+
+
+def test_nms_merges_box_cut_at_tile_seam():
+    # box đầy đủ từ tile trái, mảnh bị cắt ở mép tile phải (IoU thấp, IoS cao)
+    boxes = np.array([[100, 0, 200, 50], [160, 0, 200, 50]], dtype=np.float32)
+    scores = np.array([0.6, 0.9], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [1, 0]
+    edge = np.array([False, True])
+    assert nms(boxes, scores, 0.5, edge).tolist() == [0]
+
+
+def test_edge_mask_ignores_image_border():
+    xyxy = np.array([[0, 10, 20, 30], [500, 10, 512, 30]], dtype=np.float32)
+    # tile ở góc trái trên của ảnh: mép trái là mép ảnh, mép phải là mép trong
+    assert TiledPredictor.edge_mask(xyxy, (0, 0, 512, 512), 2000, 2000).tolist() == [False, True]
+    # tile ở giữa: cả 2 mép đều là mép trong
+    assert TiledPredictor.edge_mask(xyxy, (400, 0, 512, 512), 2000, 2000).tolist() == [True, True]
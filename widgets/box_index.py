@@ -0,0 +1,85 @@
+import math
+
+
+class BoxGridIndex:
+    # lưới đều trên toạ độ ảnh: cell -> index box, hit-test chỉ xét box gần điểm
+    # box quá lớn (phủ nhiều cell) để riêng trong big, luôn được xét
+    MAX_CELLS_PER_BOX = 256
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.box_cells = {}
+        self.big = set()
+        self.source = None
+        self.count = -1
+
+    def cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        return (
+            math.floor(left / size), math.floor(top / size),
+            math.floor(right / size), math.floor(bottom / size)
+        )
+
+    def insert(self, idx, rect):
+        x0, y0, x1, y1 = self.cell_range(rect.left(), rect.top(), rect.right(), rect.bottom())
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.MAX_CELLS_PER_BOX:
+            self.big.add(idx)
+            self.box_cells[idx] = None
+            return
+        keys = [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+        for key in keys:
+            self.cells.setdefault(key, set()).add(idx)
+        self.box_cells[idx] = keys
+
+    def remove(self, idx):
+        keys = self.box_cells.pop(idx, None)
+        self.big.discard(idx)
+        for key in keys or ():
+            cell = self.cells.get(key)
+            if cell is not None:
+                cell.discard(idx)
+                if not cell:
+                    del self.cells[key]
+
+    def update(self, idx, rect):
+        if self.source is None:
+            return
+        self.remove(idx)
+        self.insert(idx, rect)
+
+    def rebuild(self, boxes):
+        self.cells = {}
+        self.box_cells = {}
+        self.big = set()
+        for idx, item in enumerate(boxes):
+            self.insert(idx, item["rect"])
+        self.source = boxes
+        self.count = len(boxes)
+
+    def invalidate(self):
+        self.source = None
+
+    def sync(self, boxes):
+        # list bị thay (undo, xóa label) hoặc thêm/xóa box -> build lại
+        if boxes is not self.source or len(boxes) != self.count:
+            self.rebuild(boxes)
+
+    def query(self, left, top, right, bottom):
+        x0, y0, x1, y1 = self.cell_range(left, top, right, bottom)
+        found = set(self.big)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # vùng hỏi lớn hơn số cell đang có: duyệt cell
+            for (cx, cy), cell in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found |= cell
+            return found
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found |= cell
+        return found
+
+    def query_point(self, x, y, pad=0.0):
+        return self.query(x - pad, y - pad, x + pad, y + pad)
@@ -0,0 +1,194 @@
+from collections import OrderedDict, deque
+
+# ước lượng bytes cho 1 box / 1 command (dict + QRectF + tuple)
+BOX_BYTES = 400
+CMD_BYTES = 300
+
+
+# mỗi command chỉ lưu phần thay đổi (index + box/rect/label), không snapshot cả ảnh
+def create_cmd(index, box):
+    return {"op": "create", "index": index, "box": dict(box)}
+
+
+def delete_cmd(index, box):
+    return {"op": "delete", "index": index, "box": dict(box)}
+
+
+def rect_cmd(index, old_rect, new_rect):
+    return {"op": "rect", "index": index, "old": old_rect, "new": new_rect}
+
+
+def label_cmd(index, old_label, old_name, new_label, new_name):
+    return {
+        "op": "label",
+        "index": index,
+        "old": (old_label, old_name),
+        "new": (new_label, new_name),
+    }
+
+
+def replace_cmd(old_boxes, new_boxes):
+    # thao tác hàng loạt hiếm gặp (xóa cả 1 class), chỉ dùng cho journal
+    return {
+        "op": "replace",
+        "old": [dict(b) for b in old_boxes],
+        "new": [dict(b) for b in new_boxes],
+    }
+
+
+def apply_cmd(boxes, cmd, reverse=False):
+    op = cmd["op"]
+    if op in ("create", "delete"):
+        insert = (op == "create") != reverse
+        if insert:
+            boxes.insert(cmd["index"], dict(cmd["box"]))
+        else:
+            del boxes[cmd["index"]]
+    elif op == "rect":
+        boxes[cmd["index"]]["rect"] = cmd["old"] if reverse else cmd["new"]
+    elif op == "label":
+        label, name = cmd["old"] if reverse else cmd["new"]
+        box = boxes[cmd["index"]]
+        box["label"] = label
+        box["label_name"] = name
+    elif op == "replace":
+        boxes[:] = [dict(b) for b in (cmd["old"] if reverse else cmd["new"])]
+
+
+def cmd_bytes(cmd):
+    if cmd["op"] == "replace":
+        return CMD_BYTES + BOX_BYTES * (len(cmd["old"]) + len(cmd["new"]))
+    return CMD_BYTES
+
+
+class EditHistory:
+    def __init__(self, limit=100):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+        # hash nội dung label lúc rời ảnh, để biết label file có bị đổi từ ngoài
+        self.label_sig = None
+        # listener(action, cmd): báo mỗi thay đổi ra ngoài (journal)
+        self.listener = None
+        # tổng bytes ước lượng, cộng dồn theo từng thay đổi
+        self.bytes = 0
+        # key + on_resize(history, delta): do HistoryStore gán
+        self.key = None
+        self.on_resize = None
+
+    def memory(self):
+        return self.bytes
+
+    def notify(self, action, cmd):
+        if self.listener is not None:
+            self.listener(action, cmd)
+
+    def resize(self, delta):
+        self.bytes += delta
+        if self.on_resize is not None:
+            self.on_resize(self, delta)
+
+    @staticmethod
+    def append(stack, cmd):
+        # deque đầy tự bỏ command cũ nhất -> trả về bytes bị bỏ
+        dropped = cmd_bytes(stack[0]) if len(stack) == stack.maxlen else 0
+        stack.append(cmd)
+        return dropped
+
+    def push(self, cmd):
+        delta = cmd_bytes(cmd) - sum(cmd_bytes(c) for c in self.redo_stack)
+        delta -= self.append(self.undo_stack, cmd)
+        self.redo_stack.clear()
+        self.notify("edit", cmd)
+        self.resize(delta)
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self, boxes):
+        if not self.undo_stack:
+            return None
+        cmd = self.undo_stack.pop()
+        apply_cmd(boxes, cmd, reverse=True)
+        dropped = self.append(self.redo_stack, cmd)
+        self.notify("undo", cmd)
+        self.resize(-dropped)
+        return cmd
+
+    def redo(self, boxes):
+        if not self.redo_stack:
+            return None
+        cmd = self.redo_stack.pop()
+        apply_cmd(boxes, cmd)
+        dropped = self.append(self.undo_stack, cmd)
+        self.notify("redo", cmd)
+        self.resize(-dropped)
+        return cmd
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.resize(-self.bytes)
+
+
+class HistoryStore:
+    # history riêng cho từng ảnh trong cả session, LRU giới hạn tổng bộ nhớ.
+    # Chỉ giữ history có command; mỗi history tính thêm OVERHEAD bytes
+    # (object + 2 deque + entry dict) để duyệt qua rất nhiều ảnh không vượt budget.
+    OVERHEAD = 1024
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, limit=100):
+        self.max_bytes = max_bytes
+        self.limit = limit
+        self.histories = OrderedDict()
+        self.total = 0
+
+    def get(self, key):
+        history = self.histories.get(key)
+        if history is not None:
+            self.histories.move_to_end(key)
+            return history
+        # history mới chưa lưu, có command đầu tiên mới vào store (resize)
+        history = EditHistory(self.limit)
+        history.key = key
+        history.on_resize = self.resize
+        return history
+
+    def resize(self, history, delta):
+        key = history.key
+        stored = self.histories.get(key)
+        if stored is history:
+            self.total += delta
+            if not history.bytes:
+                # rỗng -> bỏ khỏi store
+                del self.histories[key]
+                self.total -= self.OVERHEAD
+                return
+        elif history.bytes:
+            # history mới (hoặc đã bị evict) có command lại
+            self.discard(key)
+            self.histories[key] = history
+            self.total += history.bytes + self.OVERHEAD
+        else:
+            return
+        self.histories.move_to_end(key)
+        if delta > 0:
+            self.evict()
+
+    def discard(self, key):
+        history = self.histories.pop(key, None)
+        if history is not None:
+            self.total -= history.bytes + self.OVERHEAD
+
+    def evict(self):
+        # history vừa sửa ở cuối, luôn giữ
+        while len(self.histories) > 1 and self.total > self.max_bytes:
+            _, history = self.histories.popitem(last=False)
+            self.total -= history.bytes + self.OVERHEAD
+
+    def clear(self):
+        # history rỗng tự rời store; object vẫn dùng được (canvas + listener đang trỏ tới)
+        for history in list(self.histories.values()):
+            history.clear()
@@ -1,11 +1,22 @@
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QPen, QPixmap, QColor, QCursor
+from PyQt5.QtGui import QPainter, QPen, QPixmap, QColor, QCursor, QBrush, QImageReader
 from PyQt5.QtCore import Qt, QRect, QPoint, pyqtSignal, QSize, QPointF, QRectF, QSizeF
 import colorsys
+from widgets.box_index import BoxGridIndex
+from widgets.edit_history import (
+    EditHistory, create_cmd, delete_cmd, rect_cmd, label_cmd, replace_cmd
+)
+from widgets.tile_pyramid import TilePyramid
 from gui.logger import setup_logger
 log = setup_logger()
 
 class ImageCanvas(QWidget):
+    # từ ~40 MP trở lên dùng tile pyramid
+    PYRAMID_MIN_PIXELS = 40_000_000
+    # kích thước tối thiểu (px màn hình) để vẽ tên label
+    TEXT_MIN_WIDTH = 24
+    TEXT_MIN_HEIGHT = 12
+
     box_created = pyqtSignal(QRectF)
     box_double_clicked = pyqtSignal(int)
     boxes_changed = pyqtSignal()
@@ -16,10 +27,14 @@ class ImageCanvas(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.pixmap = None
+        self.pyramid = None
+        self.image_size = None
+        self.scaled_cache = None
         self.scale = 1.0
         self.boxes = []
-        self.undo_stack = []
-        self.redo_stack = []
+        self.history = EditHistory()
+        # (index, rect) lúc bắt đầu kéo/resize
+        self.edit_start = None
         self.drawing = False
         self.current_label = None
         self.current_rect = None
@@ -33,56 +48,102 @@ class ImageCanvas(QWidget):
         self.setFocusPolicy(Qt.StrongFocus)
         self.panning = False
         self.last_pan_pos = None
+        self.box_index = BoxGridIndex()
+        self.label_colors = {}
+        self.box_styles = {}
+        self.style_scale = None
 
-    def load_image(self, path):
-        self.pixmap = QPixmap(path)
-        if self.pixmap.isNull():
-            return
+    def has_image(self):
+        return self.image_size is not None
+
+    def close_pyramid(self):
+        if self.pyramid is not None:
+            self.pyramid.close()
+            self.pyramid = None
+
+    def clear_image(self):
+        self.scaled_cache = None
+        self.pixmap = None
+        self.close_pyramid()
+        self.image_size = None
+        self.boxes.clear()
+        self.box_index.invalidate()
+        self.update()
+
+    def load_image(self, path, image=None, history=None):
+        # image: QImage đã decode sẵn (prefetch), tránh decode trên GUI thread
+        size = image.size() if image is not None else QImageReader(path).size()
+        self.close_pyramid()
+        self.scaled_cache = None
+        if size.isValid() and size.width() * size.height() >= self.PYRAMID_MIN_PIXELS:
+            # ảnh rất lớn: tile decode ở nền, GUI thread chỉ đọc header
+            self.pixmap = None
+            self.pyramid = TilePyramid(path, size)
+            self.pyramid.updated.connect(self.update)
+            self.image_size = size
+        else:
+            if image is not None:
+                self.pixmap = QPixmap.fromImage(image)
+            else:
+                self.pixmap = QPixmap(path)
+            if self.pixmap.isNull():
+                # ảnh lỗi/ghi dở: không giữ history của ảnh trước
+                self.image_size = None
+                self.boxes.clear()
+                self.history = EditHistory()
+                return
+            self.image_size = self.pixmap.size()
         self.scale = self.fit_scale()
         self.center_image()
         self.boxes.clear()
-        self.undo_stack.clear()
-        self.redo_stack.clear()
+        self.box_index.invalidate()
+        # history riêng của ảnh (HistoryStore) hoặc history mới
+        self.history = history if history is not None else EditHistory()
         self.current_rect = None
         self.start_pos = None
         self.update()
 
     def paintEvent(self, event):
-        if not self.pixmap:
+        if not self.has_image():
             return
 
         painter = QPainter(self)
         painter.setRenderHints(QPainter.Antialiasing)
-        
+        if self.pyramid is None:
+            self.draw_pixmap(painter)
+
         painter.translate(self.offset)
         painter.scale(self.scale, self.scale)
 
-        painter.drawPixmap(0, 0, self.pixmap)
+        if self.pyramid is not None:
+            self.pyramid.draw(painter, self.visible_image_rect(), self.scale)
+
+        if self.style_scale != self.scale:
+            # pen width phụ thuộc scale -> chỉ tạo lại khi zoom
+            self.box_styles.clear()
+            self.style_scale = self.scale
 
-        for idx, item in enumerate(self.boxes):
+        for idx in self.visible_box_indices():
+            item = self.boxes[idx]
             rect = item["rect"]
             label_id = item["label"]
-            label_name = str(item.get("label_name", ""))
-            # canvas_rect = self.map_to_canvas(rect)
-            color = self.get_label_color(label_id)
-            if self.selected_box == idx: 
-                pen = QPen(Qt.white, 2 / self.scale)
-                fill = QColor(color)
-                fill.setAlpha(120)
-            else:
-                pen = QPen(color, 1 / self.scale)
-                fill = QColor(color)
-                fill.setAlpha(40)
-            
-            pen.setCosmetic(False)
+            selected = self.selected_box == idx
+            pen, fill = self.box_style(label_id, selected)
             painter.setPen(pen)
             painter.setBrush(fill)
             painter.drawRect(rect)
-            if self.selected_box == idx:
-                self.draw_handles(painter, rect, color)
-
+            if selected:
+                self.draw_handles(painter, rect, self.get_label_color(label_id))
+
+            # LOD: box quá nhỏ trên màn hình thì bỏ chữ
+            if (
+                rect.width() * self.scale < self.TEXT_MIN_WIDTH
+                or rect.height() * self.scale < self.TEXT_MIN_HEIGHT
+            ):
+                continue
+            label_name = item.get("label_name", "")
             if label_name:
-                painter.drawText(rect.topLeft() + QPointF(3 / self.scale, -3 / self.scale), label_name)
+                painter.drawText(rect.topLeft() + QPointF(3 / self.scale, -3 / self.scale), str(label_name))
 
         # drawing bbox(realtime)
         if self.current_rect: 
@@ -97,6 +158,74 @@ class ImageCanvas(QWidget):
             self.draw_handles(painter, rect, color)
     
 
+    # bản scale sẵn theo self.scale, chỉ tạo lại khi zoom đổi
+    def scaled_pixmap(self):
+        if self.scale >= 1:
+            return None
+        if self.scaled_cache is None or self.scaled_cache[0] != self.scale:
+            scaled = self.pixmap.scaled(
+                max(1, round(self.pixmap.width() * self.scale)),
+                max(1, round(self.pixmap.height() * self.scale)),
+                Qt.IgnoreAspectRatio,
+                Qt.SmoothTransformation
+            )
+            self.scaled_cache = (self.scale, scaled)
+        return self.scaled_cache[1]
+
+    # vẽ ảnh ở toạ độ widget (painter chưa scale)
+    def draw_pixmap(self, painter):
+        scaled = self.scaled_pixmap()
+        if scaled is not None:
+            painter.drawPixmap(QPointF(self.offset), scaled)
+            return
+        # zoom >= 1: chỉ vẽ phần ảnh đang hiện
+        source = self.visible_image_rect().intersected(
+            QRectF(0, 0, self.pixmap.width(), self.pixmap.height())
+        )
+        if source.isEmpty():
+            return
+        target = QRectF(
+            source.left() * self.scale + self.offset.x(),
+            source.top() * self.scale + self.offset.y(),
+            source.width() * self.scale,
+            source.height() * self.scale
+        )
+        painter.drawPixmap(target, self.pixmap, source)
+
+    # vùng ảnh đang hiện trên widget (toạ độ ảnh)
+    def visible_image_rect(self):
+        left = -self.offset.x() / self.scale
+        top = -self.offset.y() / self.scale
+        return QRectF(left, top, self.width() / self.scale, self.height() / self.scale)
+
+    def visible_box_indices(self):
+        view = self.visible_image_rect()
+        if (
+            view.left() <= 0 and view.top() <= 0
+            and view.right() >= self.image_size.width()
+            and view.bottom() >= self.image_size.height()
+        ):
+            return range(len(self.boxes))
+        self.box_index.sync(self.boxes)
+        return sorted(self.box_index.query(view.left(), view.top(), view.right(), view.bottom()))
+
+    def box_style(self, label_id, selected):
+        key = (label_id, selected)
+        style = self.box_styles.get(key)
+        if style is None:
+            color = self.get_label_color(label_id)
+            fill = QColor(color)
+            if selected:
+                pen = QPen(Qt.white, 2 / self.scale)
+                fill.setAlpha(120)
+            else:
+                pen = QPen(color, 1 / self.scale)
+                fill.setAlpha(40)
+            pen.setCosmetic(False)
+            style = (pen, QBrush(fill))
+            self.box_styles[key] = style
+        return style
+
     def map_to_image(self, pos):
         x = (pos.x() - self.offset.x()) / self.scale
         y = (pos.y() - self.offset.y()) / self.scale
@@ -112,7 +241,7 @@ class ImageCanvas(QWidget):
     # click vào bbox, click ra ngoài
     def mousePressEvent(self, event):
         self.setFocus()
-        if not self.pixmap:
+        if not self.has_image():
             return
         
         pos_canvas = event.pos()
@@ -128,33 +257,28 @@ class ImageCanvas(QWidget):
 
             # vẽ box mới
             if self.drawing:
-                self.save_state()
                 self.start_pos = pos_img
                 self.current_rect = QRectF(pos_img, pos_img)
                 self.update()
                 return
             
-            for idx in reversed(range(len(self.boxes))):
-                rect_img = self.boxes[idx]["rect"]
-                rect_canvas = self.map_to_canvas(rect_img)
-                handle = self.detect_handle(pos_canvas, rect_canvas)
-                
-                if handle:
-                    # resize mode
-                    self.save_state()
-                    self.selected_box = idx
-                    self.resize_mode = handle
-                    cursor_map = {
-                        "tl": Qt.SizeFDiagCursor,
-                        "br": Qt.SizeFDiagCursor,
-                        "tr": Qt.SizeBDiagCursor,
-                        "bl": Qt.SizeBDiagCursor,
-                    }
-                    self.setCursor(cursor_map.get(handle,Qt.ArrowCursor))
-                    return
+            idx, handle = self.find_handle_at(pos_canvas)
+            if handle:
+                # resize mode
+                self.edit_start = (idx, self.boxes[idx]["rect"])
+                self.selected_box = idx
+                self.resize_mode = handle
+                cursor_map = {
+                    "tl": Qt.SizeFDiagCursor,
+                    "br": Qt.SizeFDiagCursor,
+                    "tr": Qt.SizeBDiagCursor,
+                    "bl": Qt.SizeBDiagCursor,
+                }
+                self.setCursor(cursor_map.get(handle,Qt.ArrowCursor))
+                return
             idx = self.find_box_at(pos_img)
             if idx != -1:
-                self.save_state()
+                self.edit_start = (idx, self.boxes[idx]["rect"])
                 self.selected_box = idx
                 self.dragging = True
                 self.drag_offset = pos_img - self.boxes[idx]["rect"].topLeft()
@@ -167,7 +291,7 @@ class ImageCanvas(QWidget):
             
     # bắt đầu vẽ
     def mouseMoveEvent(self, event):
-        if not self.pixmap: 
+        if not self.has_image(): 
             return
         
         pos_img = self.map_to_image(event.pos())
@@ -193,6 +317,7 @@ class ImageCanvas(QWidget):
                 bottom = pos_img.y()
 
             item["rect"] = QRectF(QPointF(left, top), QPointF(right, bottom)).normalized()
+            self.box_index.update(self.selected_box, item["rect"])
             self.update()
             return
 
@@ -212,6 +337,7 @@ class ImageCanvas(QWidget):
                 new_top_left,
                 QSizeF(r.width(), r.height())
             )
+            self.box_index.update(self.selected_box, item["rect"])
             self.update()
             return
 
@@ -253,11 +379,14 @@ class ImageCanvas(QWidget):
         if self.panning:
             self.panning = False
             self.setCursor(Qt.ArrowCursor)
-        if was_dragging or was_resizing:
+        if (was_dragging or was_resizing) and self.edit_start is not None:
+            idx, old_rect = self.edit_start
+            if idx < len(self.boxes) and QRectF(self.boxes[idx]["rect"]) != QRectF(old_rect):
+                self.history.push(rect_cmd(idx, old_rect, self.boxes[idx]["rect"]))
             self.boxes_changed.emit()
+        self.edit_start = None
 
         if self.current_rect:
-            self.save_state()
             rect = self.current_rect.normalized()
             self.box_created.emit(rect)
 
@@ -268,7 +397,7 @@ class ImageCanvas(QWidget):
         self.update()
 
     def mouseDoubleClickEvent(self, event):
-        if not self.pixmap:
+        if not self.has_image():
             return
         pos_img = self.map_to_image(event.pos())
         idx = self.find_box_at(pos_img)
@@ -278,7 +407,7 @@ class ImageCanvas(QWidget):
         event.accept()
 
     def fit_to_window(self):
-        if not self.pixmap:
+        if not self.has_image():
             return
         
         self.scale = self.fit_scale()
@@ -322,7 +451,10 @@ class ImageCanvas(QWidget):
         if event.key() == Qt.Key_Delete:
             if self.selected_box is not None:
                 if 0 <= self.selected_box < len(self.boxes):
-                    del self.boxes[self.selected_box]
+                    box = self.boxes.pop(self.selected_box)
+                    self.history.push(delete_cmd(self.selected_box, box))
+                    # index sau box bị xóa dịch đi 1
+                    self.box_index.invalidate()
                     self.boxes_changed.emit()
                 self.selected_box = None
                 self.unsetCursor()
@@ -394,15 +526,34 @@ class ImageCanvas(QWidget):
 
     # detect click bbox
     def find_box_at(self, pos_img):
-        for item in range(len(self.boxes) -1, -1, -1):
+        self.box_index.sync(self.boxes)
+        # box vẽ sau nằm trên -> xét index lớn trước
+        for item in sorted(self.box_index.query_point(pos_img.x(), pos_img.y()), reverse=True):
             rect = self.boxes[item]["rect"]
             if rect.contains(pos_img):
                 return item
         return -1
 
+    # handle góc nằm dưới chuột (idx, "tl"/"tr"/"bl"/"br") hoặc (-1, None)
+    def find_handle_at(self, pos_canvas):
+        self.box_index.sync(self.boxes)
+        size = max(6, int(8 / self.scale))
+        pad = (size / 2 + 1) / self.scale
+        x = (pos_canvas.x() - self.offset.x()) / self.scale
+        y = (pos_canvas.y() - self.offset.y()) / self.scale
+        for idx in sorted(self.box_index.query_point(x, y, pad), reverse=True):
+            rect_canvas = self.map_to_canvas(self.boxes[idx]["rect"])
+            handle = self.detect_handle(pos_canvas, rect_canvas)
+            if handle:
+                return idx, handle
+        return -1, None
+
+    def invalidate_box_index(self):
+        self.box_index.invalidate()
+
     # ctrl zoom in, zoom out
     def wheelEvent(self, event):
-        if not self.pixmap:
+        if not self.has_image():
             return
         if event.modifiers() & Qt.ControlModifier:
             mouse_pos = event.pos()
@@ -437,7 +588,7 @@ class ImageCanvas(QWidget):
         self.update()
 
     def zoom_out(self):
-        if not self.pixmap:
+        if not self.has_image():
             return
         min_scale = self.fit_scale()
         new_scale = self.scale * 0.9
@@ -455,10 +606,13 @@ class ImageCanvas(QWidget):
         self.current_label = label_id
         
     def get_label_color(self, label_id):
-        hue = (label_id * 37) % 360
-        color = QColor()
-        color.setHsv(hue, 255, 200)
-        return color
+        color = self.label_colors.get(label_id)
+        if color is None:
+            hue = (label_id * 37) % 360
+            color = QColor()
+            color.setHsv(hue, 255, 200)
+            self.label_colors[label_id] = color
+        return QColor(color)
     
     #cursor màu
     def set_label_cursor(self, label_id):
@@ -486,14 +640,14 @@ class ImageCanvas(QWidget):
     # resize auto scale
     def resizeEvent(self, event):
         
-        if self.pixmap:
+        if self.has_image():
             if self.scale <= self.fit_scale():
                 self.fit_to_window()
         self.update()
 
     # update cursor
     def update_cursor(self, pos_canvas):
-        if not self.pixmap:
+        if not self.has_image():
             self.setCursor(Qt.ArrowCursor)
             return
         #1: resize mode
@@ -520,18 +674,18 @@ class ImageCanvas(QWidget):
         self.setCursor(Qt.ArrowCursor)
     
     def fit_scale(self):
-        if not self.pixmap:
+        if not self.has_image():
             return 1.0
         return min(
-            self.width() / self.pixmap.width(),
-            self.height() / self.pixmap.height()
+            self.width() / self.image_size.width(),
+            self.height() / self.image_size.height()
         )
     
     def clamp_offset(self):
-        if not self.pixmap:
+        if not self.has_image():
             return
-        scaled_w = self.pixmap.width() * self.scale
-        scaled_h = self.pixmap.height() * self.scale
+        scaled_w = self.image_size.width() * self.scale
+        scaled_h = self.image_size.height() * self.scale
         min_x = self.width() - scaled_w
         min_y = self.height() - scaled_h
         max_x = 0
@@ -540,10 +694,10 @@ class ImageCanvas(QWidget):
         self.offset.setY(max(min_y, min(self.offset.y(), max_y)))
     
     def center_image(self):
-        if not self.pixmap:
+        if not self.has_image():
             return
-        scaled_w = self.pixmap.width() * self.scale
-        scaled_h = self.pixmap.height() * self.scale
+        scaled_w = self.image_size.width() * self.scale
+        scaled_h = self.image_size.height() * self.scale
         canvas_w = self.width()
         canvas_h = self.height()
         self.offset = QPointF(
@@ -551,30 +705,56 @@ class ImageCanvas(QWidget):
             (canvas_h - scaled_h) / 2
         )
 
-    def clone_boxes(self):
-        return[
-            {
-                "rect": QRectF(box["rect"]),
-                "label": box["label"]
-            }
-            for box in self.boxes
-        ]
-    def save_state(self):
-        self.undo_stack.append(self.clone_boxes())
-        if len(self.undo_stack) > 100:
-            self.undo_stack.pop(0)
-        self.redo_stack.clear()
+    # các thay đổi box từ ngoài canvas (MainWindow) đi qua đây để ghi history
+    def add_box(self, box):
+        self.boxes.append(box)
+        self.history.push(create_cmd(len(self.boxes) - 1, box))
+        self.box_index.invalidate()
+
+    def set_box_label(self, idx, label_id, label_name):
+        box = self.boxes[idx]
+        cmd = label_cmd(idx, box["label"], box.get("label_name", ""), label_id, label_name)
+        box["label"] = label_id
+        box["label_name"] = label_name
+        self.history.push(cmd)
+        self.boxes_changed.emit()
+
+    def replace_boxes(self, boxes):
+        # xóa cả 1 class đổi id của mọi box và cả danh sách class -> không undo được,
+        # history cũ tham chiếu id cũ nên bỏ đi; journal vẫn ghi lại thay đổi
+        cmd = replace_cmd(self.boxes, boxes)
+        self.history.clear()
+        self.history.notify("edit", cmd)
+        self.boxes[:] = boxes
+        self.selected_box = None
+        self.box_index.invalidate()
+        self.boxes_changed.emit()
+
     def undo(self):
-        if not self.undo_stack:
+        try:
+            if self.history.undo(self.boxes) is None:
+                return
+        except (IndexError, KeyError):
+            self.history_mismatch()
             return
-        self.redo_stack.append(self.clone_boxes())
-        self.boxes = self.undo_stack.pop()
-        self.update()
-        self.boxes_changed.emit()
+        self.after_history_change()
+
     def redo(self):
-        if not self.redo_stack:
+        try:
+            if self.history.redo(self.boxes) is None:
+                return
+        except (IndexError, KeyError):
+            self.history_mismatch()
             return
-        self.undo_stack.append(self.clone_boxes())
-        self.boxes = self.redo_stack.pop()
+        self.after_history_change()
+
+    def history_mismatch(self):
+        # command không khớp box hiện tại -> bỏ history, không để lỗi thoát khỏi slot Qt
+        log.warning("Edit history does not match current boxes, cleared")
+        self.history.clear()
+
+    def after_history_change(self):
+        self.selected_box = None
+        self.box_index.invalidate()
         self.update()
-        self.boxes_changed.emit()
\ No newline at end of file
+        self.boxes_changed.emit()
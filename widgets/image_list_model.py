@@ -0,0 +1,44 @@
+import os
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class ImageListModel(QAbstractListModel):
+    # chỉ giữ list path (dùng chung với MainWindow.current_images),
+    # tên file chỉ tạo khi view vẽ row đang hiện
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paths = []
+
+    def set_paths(self, paths):
+        self.beginResetModel()
+        self.paths = paths
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.paths):
+            return None
+        if role == Qt.DisplayRole:
+            return os.path.basename(self.paths[index.row()])
+        if role == Qt.ToolTipRole:
+            return self.paths[index.row()]
+        return None
+
+    def append_paths(self, paths):
+        if not paths:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        self.paths.extend(paths)
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        if not 0 <= row < len(self.paths):
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.paths[row]
+        self.endRemoveRows()
@@ -0,0 +1,210 @@
+import math
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QObject, QRect, QRectF, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+
+_pool = None
+
+
+def tile_pool():
+    # pool dùng chung cho mọi pyramid: pool riêng sẽ chờ task đang chạy khi bị hủy
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(2)
+    return _pool
+
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * 4
+
+
+class _PyramidTask(QRunnable):
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        self.fn(*self.args)
+
+
+class TilePyramid(QObject):
+    # ảnh rất lớn: không giữ ảnh gốc trong RAM. Decode 1 lần ở thread nền,
+    # cắt tile mọi level ra thư mục tạm (kể cả JPEG: clip từng tile với
+    # QImageReader vẫn phải decode lại file từ đầu mỗi tile), tile đọc lại
+    # từ đĩa khi cần. Ảnh overview nhỏ dùng tạm khi tile chưa có.
+    # Mọi pixmap (cả overview) tính vào budget MB.
+    updated = pyqtSignal()
+    _tile_loaded = pyqtSignal(object, QImage)
+    _overview_loaded = pyqtSignal(QImage)
+
+    def __init__(self, path, size, tile_size=512, budget_mb=256, overview_side=2048):
+        super().__init__()
+        self.path = path
+        self.tile_size = tile_size
+        self.budget = budget_mb * 1024 * 1024
+        self.width = size.width()
+        self.height = size.height()
+        self.level_count = 1
+        while max(self.width, self.height) >> (self.level_count - 1) > tile_size:
+            self.level_count += 1
+        self.overview_side = overview_side
+        self.overview = None
+        self.tiles = OrderedDict()
+        self.total = 0
+        self.pending = set()
+        # tile decode lỗi (file ghi dở...) không thử lại mỗi lần vẽ
+        self.failed = set()
+        self.closed = False
+        self.lock = threading.Lock()
+
+        self.tile_dir = tempfile.mkdtemp(prefix="tplabel-tiles-")
+        # tile chỉ có sau khi build cắt xong
+        self.ready = False
+
+        self._tile_loaded.connect(self.on_tile_loaded)
+        self._overview_loaded.connect(self.on_overview_loaded)
+        self.pool = tile_pool()
+        self.pool.start(_PyramidTask(self.build))
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            tile_dir = self.tile_dir
+        # bỏ các tile đang xếp hàng của ảnh cũ (chỉ pyramid dùng pool này)
+        self.pool.clear()
+        self.tiles.clear()
+        self.overview = None
+        self.total = 0
+        if tile_dir:
+            shutil.rmtree(tile_dir, ignore_errors=True)
+
+    def level_size(self, level):
+        return (
+            max(1, math.ceil(self.width / (1 << level))),
+            max(1, math.ceil(self.height / (1 << level))),
+        )
+
+    def level_for(self, scale):
+        # level có độ phân giải >= độ phân giải màn hình
+        if scale >= 1:
+            return 0
+        level = int(math.floor(math.log2(1.0 / scale)))
+        return max(0, min(level, self.level_count - 1))
+
+    def tile_file(self, level, tx, ty):
+        return os.path.join(self.tile_dir, f"{level}_{tx}_{ty}.png")
+
+    # thread nền
+    def build(self):
+        # decode 1 lần, cắt tile mọi level ra đĩa, giải phóng ngay
+        image = QImage(self.path)
+        overview = None
+        for level in range(self.level_count):
+            with self.lock:
+                if self.closed:
+                    break
+            if level > 0:
+                lw, lh = self.level_size(level)
+                image = image.scaled(lw, lh, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            if image.isNull():
+                break
+            if overview is None and max(image.width(), image.height()) <= self.overview_side:
+                overview = image.copy()
+            size = self.tile_size
+            for ty in range(math.ceil(image.height() / size)):
+                for tx in range(math.ceil(image.width() / size)):
+                    rect = QRect(tx * size, ty * size, size, size).intersected(image.rect())
+                    image.copy(rect).save(self.tile_file(level, tx, ty), "PNG", 90)
+        del image
+        with self.lock:
+            closed = self.closed
+        if closed:
+            shutil.rmtree(self.tile_dir, ignore_errors=True)
+            return
+        self._overview_loaded.emit(overview if overview is not None else QImage())
+
+    def load_tile(self, key):
+        level, tx, ty = key
+        with self.lock:
+            if self.closed:
+                return
+        self._tile_loaded.emit(key, QImage(self.tile_file(level, tx, ty)))
+
+    # GUI thread
+    def on_overview_loaded(self, image):
+        if self.closed:
+            return
+        self.ready = True
+        if not image.isNull():
+            self.overview = QPixmap.fromImage(image)
+            self.total += pixmap_bytes(self.overview)
+        self.updated.emit()
+
+    def on_tile_loaded(self, key, image):
+        self.pending.discard(key)
+        if image.isNull():
+            self.failed.add(key)
+            return
+        if self.closed or key in self.tiles:
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.tiles[key] = pixmap
+        self.total += pixmap_bytes(pixmap)
+        self.evict()
+        self.updated.emit()
+
+    def evict(self):
+        # overview luôn giữ, vẫn tính vào budget
+        while len(self.tiles) > 1 and self.total > self.budget:
+            _, pixmap = self.tiles.popitem(last=False)
+            self.total -= pixmap_bytes(pixmap)
+
+    def tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self.tiles.get(key)
+        if pixmap is not None:
+            self.tiles.move_to_end(key)
+            return pixmap
+        if self.ready and key not in self.pending and key not in self.failed:
+            self.pending.add(key)
+            self.pool.start(_PyramidTask(self.load_tile, key))
+        return None
+
+    # painter đang ở toạ độ ảnh gốc; view = vùng ảnh đang hiện
+    def draw(self, painter, view, scale):
+        full = QRectF(0, 0, self.width, self.height)
+        if self.overview is not None:
+            # overview đủ nét thì không cần tile
+            painter.drawPixmap(full, self.overview, QRectF(self.overview.rect()))
+            if self.overview.width() / self.width >= scale:
+                return
+        level = self.level_for(scale)
+        lw, lh = self.level_size(level)
+        fx = self.width / lw
+        fy = self.height / lh
+        size = self.tile_size
+        left = max(0, int(view.left() / fx) // size)
+        top = max(0, int(view.top() / fy) // size)
+        right = min((lw - 1) // size, int(view.right() / fx) // size)
+        bottom = min((lh - 1) // size, int(view.bottom() / fy) // size)
+        for ty in range(top, bottom + 1):
+            for tx in range(left, right + 1):
+                pixmap = self.tile(level, tx, ty)
+                if pixmap is None:
+                    # tile đang decode: overview đã vẽ tạm bên dưới
+                    continue
+                target = QRectF(
+                    tx * size * fx,
+                    ty * size * fy,
+                    pixmap.width() * fx,
+                    pixmap.height() * fy
+                )
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))